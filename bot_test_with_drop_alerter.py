@@ -6,6 +6,12 @@ import discord
 from discord.ext import commands
 from discord import app_commands, Embed
 from cogs.clan_members.get_clan_members import fetch_clan_members, get_member_activities
+from cogs.stat_checker.check_stats import (MAX_COMPARE, RENDER_CACHE, fetch_many_stats, fetch_player_stats,
+                                           format_comparison_ansi, parse_username_list)
+from cogs.stat_checker.image_stat_generator.stat_card import render_stat_card
+from cogs.common.hiscores import fetch_stats
+from cogs.common.http_client import close_client
+from cogs.common.rs_api import cache_stats
 import io
 import re  # For potential future use with as_file functionality
 import asyncio
@@ -96,17 +102,17 @@ async def activity(interaction: discord.Interaction, username: str, qty_max_10_a
     await interaction.response.defer()  # Prevents timeout while processing
 
     # Fetch recent activities for the specified user
-    member_data = get_member_activities(username, qty_max_10_atm)
+    member_data = await get_member_activities(username, qty_max_10_atm)
 
     # Format activities as an embed for Discord
     embed = Embed(title=f"Recent Activities for {username}", color=discord.Color.blue())
 
-    if member_data.empty:
+    if not member_data["activities"]:
         embed.description = "No recent activities found within the last 30 days."
     else:
         activity_text = "\n".join(
             f"- **{activity['date']}**: {activity['details']}"
-            for _, activity in member_data.iterrows()
+            for activity in member_data["activities"]
         )
         embed.add_field(name="Activities", value=activity_text, inline=False)
 
@@ -139,7 +145,8 @@ async def check_stats_slash(interaction: discord.Interaction, username: str, inc
     # Acknowledge the command to prevent timeout
     await interaction.response.defer()
 
-    stats_chunks = fetch_player_stats(username)
+    # Rendered chunks come from a cache keyed by the parsed stats, so repeat lookups skip formatting
+    stats_chunks = await fetch_player_stats(username, include_activities)
 
     if not stats_chunks:
         await interaction.followup.send(
@@ -172,6 +179,59 @@ async def check_stats_slash(interaction: discord.Interaction, username: str, inc
     if include_activities and activities_chunks:
         await send_activities(interaction.followup.send, activities_chunks, username, include_activities)
 
+@bot.tree.command(name="statcard", description="Show a player's skills as an image")
+@app_commands.describe(username="The RuneScape username to draw a stat card for")
+async def stat_card_slash(interaction: discord.Interaction, username: str):
+    await interaction.response.defer()
+
+    stats = await fetch_stats(username)
+    if stats is None:
+        await interaction.followup.send(
+            f"Could not retrieve stats for {username}. Please check the username and try again.",
+            ephemeral=True
+        )
+        return
+
+    # Rendered in a worker thread from a pre-drawn template
+    image = await render_stat_card(stats)
+    await interaction.followup.send(file=discord.File(io.BytesIO(image), filename=f"{username}_stats.png"))
+
+@bot.tree.command(name="compare", description="Compare several players' levels side by side")
+@app_commands.describe(usernames=f"Up to {MAX_COMPARE} RuneScape usernames, separated by commas")
+async def compare_slash(interaction: discord.Interaction, usernames: str):
+    names = parse_username_list(usernames)
+    if len(names) < 2:
+        await interaction.response.send_message("Please give at least two usernames, separated by commas.",
+                                                ephemeral=True)
+        return
+    await interaction.response.defer()
+
+    # All players are fetched concurrently; the per-host limits in the shared client bound the burst
+    players, missing = await fetch_many_stats(names)
+    if not players:
+        await interaction.followup.send("Could not retrieve stats for any of those players.", ephemeral=True)
+        return
+
+    # Wide comparisons can exceed one embed, so each chunk gets its own
+    chunks = format_comparison_ansi(players)
+    for position, chunk in enumerate(chunks):
+        embed = Embed(description=f"```ansi\n{chunk}\n```", color=0x00ff00)
+        if position == 0:
+            embed.title = "Stat comparison"
+        if missing and position == len(chunks) - 1:
+            embed.add_field(name="Not found", value=", ".join(missing), inline=False)
+        await interaction.followup.send(embed=embed)
+
+@bot.tree.command(name="cachestats", description="Show hit/miss counters for the hiscore, RuneMetrics and render caches")
+async def cache_stats_slash(interaction: discord.Interaction):
+    lines = [
+        f"**{stats['name']}**: {stats['size']}/{stats['maxsize']} entries, ttl {stats['ttl']}s | "
+        f"hits {stats['hits']}, misses {stats['misses']}, coalesced {stats['coalesced']}, "
+        f"evictions {stats['evictions']} | hit rate {stats['hit_rate']:.1%}"
+        for stats in cache_stats() + [RENDER_CACHE.stats()]
+    ]
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
 @bot.tree.command(
     name="embed_video",
     description="Embed videos from supported platforms: Instagram, Reddit, and Twitter/X"
@@ -243,6 +303,9 @@ async def whats_up_prefix(ctx):
 # Load the alert_drops cog
 initial_extensions = [
     'cogs.clan_members.alert_drops',  # Add the new cog here
+    'cogs.clan_members.clan_refresh',
+    'cogs.dxp_leaderboard.dxp_leaderboard',
+    'cogs.ge_prices.ge_prices',
 ]
 
 
@@ -256,7 +319,10 @@ async def load_extensions():
 
 async def main():
     await load_extensions()
-    await bot.start(os.getenv('DISCORD_BOT_TOKEN'))
+    try:
+        await bot.start(os.getenv('DISCORD_BOT_TOKEN'))
+    finally:
+        await close_client()
 
 if __name__ == "__main__":
     # Ensure that the bot token is loaded from the environment variable
@@ -0,0 +1,66 @@
+# activity_rules.py
+from sqlalchemy import and_, case, func, null, or_
+
+# Ordered classification rules: the first rule whose conditions all match wins.
+# Each condition is (column, operator, value) where operator is 'equals' or 'contains';
+# matching is case-insensitive, and NULL columns never match.
+CLASSIFICATION_RULES = [
+    ('clan - citadel visit', [('text', 'equals', 'visited my clan citadel.')]),
+    ('clan - citadel cap', [('text', 'equals', 'capped at my clan citadel.')]),
+    ('pet drop', [('text', 'contains', 'i found'), ('text', 'contains', 'pet')]),
+    ('combat', [('text', 'contains', 'i killed')]),
+    ('combat', [('text', 'contains', 'i defeated')]),
+    ('item drop', [('text', 'contains', 'i found')]),
+    ('xp milestone', [('text', 'contains', 'xp in')]),
+    ('level', [('text', 'contains', 'levelled up')]),
+    ('level', [('text', 'contains', 'i levelled')]),
+    ('total levels', [('text', 'contains', 'total levels')]),
+    ('total levels', [('text', 'contains', 'levelled all skills')]),
+    ('quest', [('text', 'contains', 'quest complete')]),
+    ('clue', [('text', 'contains', 'treasure trail')]),
+    ('mtx', [('details', 'contains', 'treasure hunter')]),
+    ('clan - fealty', [('text', 'contains', 'clan fealty')]),
+    ('dungeoneering', [('text', 'contains', 'dungeon floor')]),
+    ('archaeology', [('text', 'contains', 'archaeological mystery')]),
+    ('archaeology', [('text', 'contains', 'tetracompass')]),
+    ('quest milestone', [('text', 'contains', 'quest points obtained')]),
+    ('dungeoneering', [('text', 'contains', "daemonheim's history uncovered")]),
+    ('distraction and diversion', [('text', 'contains', 'challenged by the skeleton champion')]),
+    ('songs', [('text', 'contains', 'songs unlocked')]),
+]
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_case_expression(table, rules=CLASSIFICATION_RULES):
+    """Compile the rule table into a single SQL CASE expression over the given table's columns."""
+    # Activities without text are never classified, matching classify_activity
+    whens = [(or_(table.c.text.is_(None), table.c.text == ''), null())]
+    for label, conditions in rules:
+        clauses = []
+        for column, operator, value in conditions:
+            col = table.c[column]
+            if operator == 'equals':
+                clauses.append(func.lower(col) == value)
+            else:
+                clauses.append(col.ilike(f"%{_escape_like(value)}%", escape="\\"))
+        whens.append((and_(*clauses), label))
+    return case(*whens, else_=None)
+
+
+def classify_activity(text, details, rules=CLASSIFICATION_RULES):
+    """Classify a single activity in Python; the scalar counterpart of build_case_expression."""
+    if not text:
+        return None
+    values = {'text': text.lower(), 'details': details.lower() if details else None}
+    for label, conditions in rules:
+        if all(
+            values[column] is not None and (
+                values[column] == value if operator == 'equals' else value in values[column]
+            )
+            for column, operator, value in conditions
+        ):
+            return label
+    return None
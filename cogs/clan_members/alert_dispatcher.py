@@ -0,0 +1,155 @@
+# alert_dispatcher.py
+import asyncio
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord message limits
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_DESCRIPTION = 4096
+MAX_EMBED_TOTAL = 6000
+
+# Discord's per-channel message bucket (5 messages per 5 seconds)
+DEFAULT_BUCKET_LIMIT = 5
+DEFAULT_BUCKET_WINDOW = 5.0
+
+# Failed sends are retried with exponential backoff; batches that still fail stay unalerted in the
+# database and are picked up by the next backlog load
+MAX_SEND_ATTEMPTS = 4
+RETRY_BASE_DELAY = 2.0
+
+
+class RateLimitBucket:
+    """
+    Local mirror of Discord's per-channel bucket so a large batch is paced instead of tripping 429s.
+
+    discord.py applies the real X-RateLimit-* headers internally and does not expose them on successful
+    sends, so the bucket uses Discord's documented defaults.
+    """
+
+    def __init__(self, limit=DEFAULT_BUCKET_LIMIT, window=DEFAULT_BUCKET_WINDOW):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until the bucket has a slot, then consume it."""
+        async with self._lock:
+            now = time.monotonic()
+            if now >= self.reset_at:
+                self.remaining = self.limit
+                self.reset_at = now + self.window
+            if self.remaining <= 0:
+                delay = self.reset_at - now
+                logger.info(f"Rate-limit bucket empty; waiting {delay:.2f}s.")
+                await asyncio.sleep(delay)
+                self.remaining = self.limit
+                self.reset_at = time.monotonic() + self.window
+            self.remaining -= 1
+
+
+def pack_lines(lines, max_length):
+    """Greedily pack lines into chunks no longer than max_length; an oversized line is truncated."""
+    chunks = []
+    current = []
+    current_length = 0
+    for line in lines:
+        if len(line) > max_length:
+            line = line[:max_length - 1] + "…"
+        added = len(line) + (1 if current else 0)
+        if current and current_length + added > max_length:
+            chunks.append(current)
+            current, current_length = [], 0
+            added = len(line)
+        current.append(line)
+        current_length += added
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class AlertDispatcher:
+    """
+    Pack many drop alerts into as few Discord messages as possible and mark each delivered batch alerted.
+
+    :param mark_alerted: Callable taking a list of activity ids; run in a thread after each successful send.
+    :param use_embeds: Send alerts as embeds (10 per message) instead of plain 2000-char messages.
+    """
+
+    def __init__(self, mark_alerted, use_embeds=False, title="Drop alerts", color=0xF1C40F):
+        self.mark_alerted = mark_alerted
+        self.use_embeds = use_embeds
+        self.title = title
+        self.color = color
+        self.bucket = RateLimitBucket()
+
+    def build_payloads(self, drops, format_drop):
+        """Return (send_kwargs, activity_ids) pairs covering every drop."""
+        lines = [(format_drop(drop), drop["id"]) for drop in drops]
+        payloads = []
+
+        if not self.use_embeds:
+            offset = 0
+            for chunk in pack_lines([line for line, _ in lines], MAX_CONTENT_LENGTH):
+                ids = [activity_id for _, activity_id in lines[offset:offset + len(chunk)]]
+                offset += len(chunk)
+                payloads.append(({"content": "\n".join(chunk)}, ids))
+            return payloads
+
+        embeds, ids, total = [], [], 0
+        offset = 0
+        for chunk in pack_lines([line for line, _ in lines], MAX_EMBED_DESCRIPTION):
+            description = "\n".join(chunk)
+            chunk_ids = [activity_id for _, activity_id in lines[offset:offset + len(chunk)]]
+            offset += len(chunk)
+            size = len(description) + len(self.title)
+            if embeds and (len(embeds) == MAX_EMBEDS_PER_MESSAGE or total + size > MAX_EMBED_TOTAL):
+                payloads.append(({"embeds": embeds}, ids))
+                embeds, ids, total = [], [], 0
+            embeds.append(discord.Embed(title=self.title, description=description, color=self.color))
+            ids.extend(chunk_ids)
+            total += size
+        if embeds:
+            payloads.append(({"embeds": embeds}, ids))
+        return payloads
+
+    async def send_with_retry(self, channel, send_kwargs, ids):
+        """Send one batch, retrying server errors and rate limits; returns True once it was delivered."""
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            await self.bucket.acquire()
+            try:
+                await channel.send(**send_kwargs)
+                return True
+            except discord.HTTPException as e:
+                # Other client errors (missing permissions, invalid payload) will not succeed on retry
+                retryable = e.status == 429 or e.status >= 500
+                if not retryable or attempt == MAX_SEND_ATTEMPTS:
+                    logger.error(f"Failed to send alert batch for activity IDs {ids} "
+                                 f"after {attempt} attempt(s): {e}")
+                    return False
+                delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                logger.warning(f"Alert batch send failed ({e}); retrying in {delay:.0f}s.")
+                await asyncio.sleep(delay)
+        return False
+
+    async def dispatch(self, channel, drops, format_drop):
+        """Send all drops to channel; returns the ids that were delivered and marked alerted."""
+        delivered = []
+        for send_kwargs, ids in self.build_payloads(drops, format_drop):
+            if not await self.send_with_retry(channel, send_kwargs, ids):
+                continue
+
+            try:
+                await asyncio.to_thread(self.mark_alerted, ids)
+            except Exception as e:
+                logger.error(f"Sent alerts but failed to mark activity IDs {ids} alerted: {e}")
+                continue
+            delivered.extend(ids)
+            logger.info(f"Alerted {len(ids)} drops in one message.")
+        return delivered
@@ -0,0 +1,150 @@
+# chunk_store.py
+import json
+import logging
+import os
+from datetime import datetime, date
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "date="
+CHUNK_SUFFIX = ".ndjson"
+CHECKPOINT_FILE = "_consumed.json"
+
+
+class ChunkStore:
+    """
+    Append-only store of newline-delimited JSON chunks used to hand data between pipeline stages.
+
+    Each write creates a new immutable chunk file. Time-series datasets are partitioned into
+    date=YYYY-MM-DD directories so consumers can skip whole days without opening them, and every
+    consumer streams records line by line instead of materialising the full history.
+
+    Layout:
+        <root>/<dataset>/date=2024-11-15/part-20241115T120000123456.ndjson
+        <root>/<dataset>/part-20241115T120000123456.ndjson      (unpartitioned datasets)
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dataset_dir(self, dataset):
+        return os.path.join(self.root, dataset)
+
+    def append(self, dataset, df, partition_column=None, date_format=None):
+        """
+        Write a DataFrame as new chunk(s); returns the written paths.
+
+        :param partition_column: Column holding each row's date; rows are split into one chunk per day.
+        :param date_format: strptime format of partition_column when it holds strings.
+        """
+        if df.empty:
+            return []
+        part_name = f"part-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}{CHUNK_SUFFIX}"
+        dataset_dir = self._dataset_dir(dataset)
+
+        if partition_column is None:
+            groups = [(dataset_dir, df)]
+        else:
+            days = pd.to_datetime(df[partition_column], format=date_format).dt.date
+            groups = [
+                (os.path.join(dataset_dir, f"{PARTITION_PREFIX}{day.isoformat()}"), group)
+                for day, group in df.groupby(days, sort=True)
+            ]
+
+        paths = []
+        for directory, group in groups:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, part_name)
+            tmp_path = f"{path}.tmp"
+            group.to_json(tmp_path, orient="records", lines=True, date_format="iso", force_ascii=False)
+            os.replace(tmp_path, path)  # Readers never see a half-written chunk
+            paths.append(path)
+        logger.info(f"Appended {len(df)} {dataset} records in {len(paths)} chunk(s).")
+        return paths
+
+    def chunks(self, dataset, since=None, until=None):
+        """List chunk paths in write order, skipping date partitions outside [since, until]."""
+        dataset_dir = self._dataset_dir(dataset)
+        if not os.path.isdir(dataset_dir):
+            return []
+        since = since.date() if isinstance(since, datetime) else since
+        until = until.date() if isinstance(until, datetime) else until
+
+        paths = []
+        for entry in sorted(os.listdir(dataset_dir)):
+            full_path = os.path.join(dataset_dir, entry)
+            if entry.startswith(PARTITION_PREFIX) and os.path.isdir(full_path):
+                day = date.fromisoformat(entry[len(PARTITION_PREFIX):])
+                if (since and day < since) or (until and day > until):
+                    continue
+                paths.extend(
+                    os.path.join(full_path, name) for name in os.listdir(full_path) if name.endswith(CHUNK_SUFFIX)
+                )
+            elif entry.endswith(CHUNK_SUFFIX):
+                paths.append(full_path)
+        # Part names embed the write time, so sorting by file name gives write order across partitions
+        return sorted(paths, key=os.path.basename)
+
+    def latest(self, dataset):
+        """Return the most recently written chunk as a DataFrame (for snapshot datasets such as members)."""
+        paths = self.chunks(dataset)
+        if not paths:
+            return pd.DataFrame()
+        latest_name = os.path.basename(paths[-1])
+        return pd.concat(
+            [self.read_chunk(path) for path in paths if os.path.basename(path) == latest_name],
+            ignore_index=True
+        )
+
+    @staticmethod
+    def read_chunk(path):
+        return pd.read_json(path, orient="records", lines=True, dtype=False, convert_dates=False)
+
+    def iter_records(self, dataset, since=None, until=None, paths=None):
+        """Stream records one at a time from the selected chunks."""
+        for path in paths if paths is not None else self.chunks(dataset, since, until):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def iter_batches(self, dataset, batch_size=5000, since=None, until=None, paths=None):
+        """Stream records as DataFrames of at most batch_size rows."""
+        batch = []
+        for record in self.iter_records(dataset, since, until, paths):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch)
+
+    # Consumer checkpoints: which chunks a given consumer has already processed
+
+    def _checkpoint_path(self, dataset):
+        return os.path.join(self._dataset_dir(dataset), CHECKPOINT_FILE)
+
+    def _load_checkpoints(self, dataset):
+        path = self._checkpoint_path(dataset)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def unconsumed(self, dataset, consumer):
+        """Chunk paths the consumer has not yet marked as processed."""
+        consumed = set(self._load_checkpoints(dataset).get(consumer, []))
+        return [path for path in self.chunks(dataset) if os.path.relpath(path, self._dataset_dir(dataset)) not in consumed]
+
+    def mark_consumed(self, dataset, consumer, paths):
+        checkpoints = self._load_checkpoints(dataset)
+        consumed = set(checkpoints.get(consumer, []))
+        consumed.update(os.path.relpath(path, self._dataset_dir(dataset)) for path in paths)
+        checkpoints[consumer] = sorted(consumed)
+        os.makedirs(self._dataset_dir(dataset), exist_ok=True)
+        tmp_path = f"{self._checkpoint_path(dataset)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoints, f)
+        os.replace(tmp_path, self._checkpoint_path(dataset))
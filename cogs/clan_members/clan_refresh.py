@@ -0,0 +1,59 @@
+# ~/discordbot10s/cogs/clan_members/clan_refresh.py
+
+import os
+import json
+import logging
+from discord.ext import commands, tasks
+
+from cogs.clan_members.drop_queue import publish_drops
+from cogs.clan_members.refresh_pipeline import run_refresh
+from cogs.common.db import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+class ClanRefreshCog(commands.Cog):
+    """Scheduled in-process clan refresh: fetch -> insert -> classify, handing drops to the alert cog."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = self.load_config()
+        self.engine = get_engine()
+        self.clan_name = self.config.get('clan_name', '10s')
+        self.interval = self.config.get('refresh_interval_minutes', 60)
+        self.active_only = self.config.get('active_only', False)
+
+    def load_config(self):
+        """Load configuration from clan_refresh_config.json."""
+        config_path = os.path.join(os.path.dirname(__file__), 'config', 'clan_refresh_config.json')
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"Configuration file not found: {config_path}")
+        with open(config_path) as config_file:
+            return json.load(config_file)
+
+    async def cog_load(self):
+        self.refresh_clan.change_interval(minutes=self.interval)
+        self.refresh_clan.start()
+
+    @tasks.loop(minutes=60)
+    async def refresh_clan(self):
+        """Run the clan refresh pipeline on the bot's event loop."""
+        # Only queue drops when the alert cog is loaded to consume them; otherwise they wait in the
+        # database for its backlog query
+        deliver = publish_drops if self.bot.get_cog("AlertDropsCog") else None
+        try:
+            await run_refresh(self.engine, self.clan_name, active_only=self.active_only, deliver=deliver)
+        except Exception as e:
+            logger.error(f"Clan refresh failed: {e}")
+
+    @refresh_clan.before_loop
+    async def before_refresh_clan(self):
+        await self.bot.wait_until_ready()
+
+    def cog_unload(self):
+        """Handle cleanup when the cog is unloaded."""
+        self.refresh_clan.cancel()
+
+
+async def setup(bot):
+    await bot.add_cog(ClanRefreshCog(bot))
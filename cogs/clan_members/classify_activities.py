@@ -1,19 +1,13 @@
 # classify_activities.py
 import os
-import pandas as pd
-from sqlalchemy import create_engine, Table, MetaData, select, update
-from sqlalchemy.exc import SQLAlchemyError
-from urllib.parse import quote
-import json
+import argparse
+from sqlalchemy import Table, MetaData, update
 from datetime import datetime, timedelta
 
-# Load database configuration from dbconfig.json in the parent directory
-config_path = os.path.join(os.path.expanduser("~"), 'discordbot10s', 'dbconfig.json')
-with open(config_path) as config_file:
-    config = json.load(config_file)
-
-# Create the SQLAlchemy engine using the loaded configuration
-engine = create_engine(f"postgresql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}")
+from cogs.clan_members.activity_rules import build_case_expression, classify_activity  # noqa: F401 (re-exported)
+from cogs.clan_members.drop_queue import notify_drops
+from cogs.clan_members.drop_values import annotate_drops, ensure_drop_value_columns
+from cogs.common.db import get_engine
 
 def log_message(message, row_data=None):
     """Logs informational messages with optional row data for context."""
@@ -27,98 +21,86 @@ def log_error(error_message, row_data=None):
     if row_data is not None:
         print("Row Data:", row_data)
 
-def classify_activity(text, details):
-    """Classify the activity based on its text and details."""
-    if not text:
-        return None
-
-    text = text.lower()
-    details = details.lower() if details else None
+def classify_and_update(engine, reclassify=False):
+    """
+    Classify activities server-side with one generated CASE update and return the rows newly
+    classified as 'item drop', each annotated with the matched GE item_id and item_value.
 
-    if text == 'visited my clan citadel.':
-        return 'clan - citadel visit'
-    elif text == 'capped at my clan citadel.':
-        return 'clan - citadel cap'
-    elif 'i found' in text and 'pet' in text:
-        return 'pet drop'
-    elif 'i killed' in text or 'i defeated' in text:
-        return 'combat'
-    elif 'i found' in text:
-        return 'item drop'
-    elif 'xp in' in text:
-        return 'xp milestone'
-    elif 'levelled up' in text or 'i levelled' in text:
-        return 'level'
-    elif 'total levels' in text or 'levelled all skills' in text:
-        return 'total levels'
-    elif 'quest complete' in text:
-        return 'quest'
-    elif 'treasure trail' in text:
-        return 'clue'
-    elif 'treasure hunter' in details:
-        return 'mtx'
-    elif 'clan fealty' in text:
-        return 'clan - fealty'
-    elif 'dungeon floor' in text:
-        return 'dungeoneering'
-    elif 'archaeological mystery' in text or 'tetracompass' in text:
-        return 'archaeology'
-    elif 'quest points obtained' in text:
-        return 'quest milestone'
-    elif "daemonheim's history uncovered" in text:
-        return 'dungeoneering'
-    elif 'challenged by the skeleton champion' in text:
-        return 'distraction and diversion'
-    elif 'songs unlocked' in text:
-        return 'songs'
-    else:
-        return None
-
-def classify_and_update(engine):
+    :param reclassify: Re-run the rules over the whole activities history instead of only unclassified rows.
+    """
+    ensure_drop_value_columns(engine)
     metadata = MetaData()
     activities_table = Table('activities', metadata, autoload_with=engine)
 
+    update_stmt = update(activities_table).values(activity_type=build_case_expression(activities_table))
+    if not reclassify:
+        update_stmt = update_stmt.where(activities_table.c.activity_type.is_(None))
+    update_stmt = update_stmt.returning(
+        activities_table.c.id,
+        activities_table.c.member_name,
+        activities_table.c.date,
+        activities_table.c.text,
+        activities_table.c.details,
+        activities_table.c.status,
+        activities_table.c.activity_type,
+    )
+
     with engine.begin() as conn:
-        # Classify activities where activity_type is NULL
-        select_stmt = select(activities_table).where(activities_table.c.activity_type.is_(None))
-        result = conn.execute(select_stmt)
-        activities = result.fetchall()
+        activities = conn.execute(update_stmt).fetchall()
 
-        for activity in activities:
-            activity_id = activity.id
-            text = activity.text
-            details = activity.details
-            classification = classify_activity(text, details)
+    classified = [activity for activity in activities if activity.activity_type is not None]
+    unclassified = [activity for activity in activities if activity.activity_type is None]
+    log_message(f"Classified {len(classified)} activities; {len(unclassified)} left unclassified.")
 
-            if classification:
-                update_stmt = (
-                    update(activities_table)
-                    .where(activities_table.c.id == activity_id)
-                    .values(activity_type=classification)
-                )
-                conn.execute(update_stmt)
-                log_message(f"Classified activity ID {activity_id} as '{classification}'.")
-            else:
-                # Log unclassified activities
-                with open(os.path.join(os.path.dirname(__file__), "digest.log"), "a") as digest_file:
-                    digest_entry = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Unclassified Activity ID {activity_id}: Text='{text}', Details='{details}'\n"
-                    digest_file.write(digest_entry)
-                log_message(f"Unclassified activity ID {activity_id} logged to digest.")
+    item_drops = [
+        {
+            "id": activity.id,
+            "member_name": activity.member_name,
+            "date": activity.date,
+            "text": activity.text,
+            "details": activity.details,
+        }
+        for activity in classified
+        if activity.activity_type == 'item drop' and activity.status is None
+    ]
+
+    if unclassified:
+        # Log unclassified activities
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(os.path.join(os.path.dirname(__file__), "digest.log"), "a") as digest_file:
+            digest_file.writelines(
+                f"[{timestamp}] Unclassified Activity ID {activity.id}: Text='{activity.text}', Details='{activity.details}'\n"
+                for activity in unclassified
+            )
+        log_message(f"Logged {len(unclassified)} unclassified activities to digest.")
 
     #Update status for activities older than 10 days to 'exempt'
     cleanup = True
+    five_days_ago = datetime.now() - timedelta(days=5)
     if cleanup == True:
-        five_days_ago = datetime.now() - timedelta(days=5)
         with engine.begin() as conn:
             update_stmt = (
                 update(activities_table)
                 .where(activities_table.c.date < five_days_ago)
+                .where(activities_table.c.status.is_(None))
                 .values(status='exempt')
             )
             result = conn.execute(update_stmt)
             log_message(f"Updated {result.rowcount} activities to status 'exempt'.")
 
+    # Drops that were just exempted by the cleanup above should not be alerted
+    item_drops = [drop for drop in item_drops if drop["date"] >= five_days_ago]
+    # Value each drop once here so alert filtering is a comparison on a stored column
+    return annotate_drops(engine, activities_table, item_drops)
+
 if __name__ == "__main__":
-    classify_and_update(engine)
+    parser = argparse.ArgumentParser(description="Classify clan activities.")
+    parser.add_argument('--reclassify', action='store_true', help='Reclassify the whole activities history.')
+    args = parser.parse_args()
+
+    engine = get_engine()
+    item_drops = classify_and_update(engine, reclassify=args.reclassify)
+    # Wake the alert cog in the running bot instead of waiting for it to poll
+    notify_drops(engine, [drop["id"] for drop in item_drops])
     print("Activity classification and status update completed.")
 
@@ -0,0 +1,158 @@
+# drop_queue.py
+import asyncio
+import json
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "item_drops"
+NOTIFY_CHUNK = 500  # ids per NOTIFY; keeps payloads well under Postgres' 8000 byte limit
+RECONNECT_BASE_DELAY = 5.0  # Seconds before the first LISTEN reconnect attempt, doubled up to the max
+RECONNECT_MAX_DELAY = 300.0
+QUEUE_MAXSIZE = 10000  # Drops beyond this stay unalerted in the database until the next backlog load
+
+_queue = None
+
+
+def get_drop_queue():
+    """Return the in-process queue the alert cog consumes newly classified item drops from."""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+    return _queue
+
+
+def publish_drops(drops):
+    """
+    Hand newly classified item drop rows straight to the alert cog (ingestion running inside the bot).
+
+    :param drops: Iterable of dicts with at least id, member_name, text and date.
+    """
+    queue = get_drop_queue()
+    count = 0
+    dropped = 0
+    for drop in drops:
+        try:
+            queue.put_nowait(drop)
+            count += 1
+        except asyncio.QueueFull:
+            dropped += 1
+    if count:
+        logger.info(f"Queued {count} item drops for alerting.")
+    if dropped:
+        logger.warning(f"Drop queue full; {dropped} item drops left unalerted in the database for the next backlog load.")
+    return count
+
+
+def notify_drops(engine, drop_ids):
+    """Announce new item drop ids over LISTEN/NOTIFY (ingestion running as a separate cron process)."""
+    drop_ids = list(drop_ids)
+    if not drop_ids:
+        return 0
+    with engine.begin() as conn:
+        for start in range(0, len(drop_ids), NOTIFY_CHUNK):
+            payload = json.dumps(drop_ids[start:start + NOTIFY_CHUNK])
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+    logger.info(f"Sent NOTIFY {NOTIFY_CHANNEL} for {len(drop_ids)} item drops.")
+    return len(drop_ids)
+
+
+class DropListener:
+    """
+    LISTEN on the item_drops channel and forward the announced ids to a callback.
+
+    The psycopg2 connection is polled from the event loop via add_reader, so no thread or
+    periodic query is needed while nothing is being inserted. If the connection drops it is
+    re-established with backoff, and on_reconnect (if given) is awaited to catch up on drops
+    announced while it was down.
+    """
+
+    def __init__(self, engine, on_ids, channel=NOTIFY_CHANNEL, on_reconnect=None):
+        self.engine = engine
+        self.on_ids = on_ids
+        self.on_reconnect = on_reconnect
+        self.channel = channel
+        self._conn = None
+        self._fd = None
+        self._loop = None
+        self._reconnect_task = None
+
+    def _connect(self):
+        """Open a connection and LISTEN on it (blocking)."""
+        import psycopg2
+        import psycopg2.extensions
+
+        dsn = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel};")
+        except psycopg2.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _attach(self, conn):
+        self._conn = conn
+        self._fd = conn.fileno()
+        self._loop.add_reader(self._fd, self._on_readable)
+        logger.info(f"Listening for NOTIFY on channel '{self.channel}'.")
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._attach(self._connect())
+
+    def _on_readable(self):
+        import psycopg2
+
+        try:
+            self._conn.poll()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            logger.error(f"Lost the {self.channel} LISTEN connection: {e}")
+            self._detach()
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+        ids = []
+        while self._conn.notifies:
+            notification = self._conn.notifies.pop(0)
+            try:
+                ids.extend(int(drop_id) for drop_id in json.loads(notification.payload))
+            except (ValueError, TypeError) as e:
+                logger.error(f"Ignoring malformed {self.channel} payload {notification.payload!r}: {e}")
+        if ids:
+            self._loop.create_task(self.on_ids(ids))
+
+    async def _reconnect(self):
+        import psycopg2
+
+        delay = RECONNECT_BASE_DELAY
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                conn = await asyncio.to_thread(self._connect)
+                break
+            except psycopg2.Error as e:
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                logger.warning(f"Reconnecting LISTEN on '{self.channel}' failed ({e}); retrying in {delay:.0f}s.")
+        self._attach(conn)
+        self._reconnect_task = None
+        if self.on_reconnect is not None:
+            await self.on_reconnect()
+
+    def _detach(self):
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stop(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._loop is not None:
+            self._detach()
@@ -0,0 +1,62 @@
+# drop_values.py
+import logging
+
+from sqlalchemy import bindparam, text, update
+
+from cogs.common.item_index import load_item_index
+from cogs.common.item_matcher import found_item_name, get_item_matcher
+
+logger = logging.getLogger(__name__)
+
+_columns_ready = False
+
+
+def ensure_drop_value_columns(engine):
+    """Add activities.item_id / item_value once per process (no-op when they already exist)."""
+    global _columns_ready
+    if _columns_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE activities ADD COLUMN IF NOT EXISTS item_id INTEGER"))
+        conn.execute(text("ALTER TABLE activities ADD COLUMN IF NOT EXISTS item_value BIGINT"))
+    _columns_ready = True
+
+
+def annotate_drops(engine, activities_table, drops):
+    """
+    Match each drop's text to a GE item and store its id and current price with the activity.
+
+    The dicts in `drops` gain item_id and item_value (None when no item matched or the catalog is
+    not available), so downstream alerting never has to look values up again.
+    """
+    for drop in drops:
+        drop["item_id"] = drop["item_value"] = None
+    if not drops:
+        return drops
+    if load_item_index() is None:
+        logger.warning("No item catalog loaded; item drops are stored without values.")
+        return drops
+
+    matcher = get_item_matcher()
+    updates = []
+    for drop in drops:
+        item = matcher.match(drop["text"])
+        # "I found ..." drops are valued by their exact name only; scanning the details would value an
+        # unknown drop as any shorter item named in it ("... egg" as Egg), so those stay unvalued
+        if item is None and found_item_name(drop["text"]) is None:
+            item = matcher.match(drop.get("details"))
+        if item is None:
+            continue
+        drop["item_id"], drop["item_value"] = item["id"], item.get("price")
+        updates.append({"activity_id": drop["id"], "item_id": item["id"], "item_value": item.get("price")})
+
+    if updates:
+        stmt = (
+            update(activities_table)
+            .where(activities_table.c.id == bindparam("activity_id"))
+            .values(item_id=bindparam("item_id"), item_value=bindparam("item_value"))
+        )
+        with engine.begin() as conn:
+            conn.execute(stmt, updates)
+    logger.info(f"Matched {len(updates)} of {len(drops)} item drops to GE items.")
+    return drops
@@ -1,18 +1,16 @@
 # fetch_and_flatten_test_concurrent.py
 import argparse
-import requests
 import pandas as pd
-from urllib.parse import quote
 from datetime import datetime, timedelta
 import os
-import pickle
 import asyncio
-import aiohttp
 import logging
-from aiohttp import ClientSession, ClientTimeout
-from asyncio import Semaphore
 
-print("--concurrent flag to get all names concurrently")
+from cogs.common.adaptive_limiter import AdaptiveLimiter
+from cogs.common.http_client import run_and_close
+from cogs.common.rs_api import fetch_clan_members_lite, fetch_runemetrics_profile
+from cogs.clan_members.chunk_store import ChunkStore
+from cogs.clan_members.watermarks import ACTIVITY_DATE_FORMAT, MAX_ACTIVITIES, MemberWatermarks
 
 # Configure logging to output to both console and file
 logger = logging.getLogger(__name__)
@@ -39,44 +37,24 @@ logger.addHandler(file_handler)
 
 # Constants
 DEFAULT_CLAN_NAME = "10s"
-ACTIVITIES_PICKLE = "activities_data.pkl"
-MEMBERS_PICKLE = "members_data.pkl"
+ACTIVITIES_DATASET = "activities"
+MEMBERS_DATASET = "members"
 OUTPUT_DIR = "fetch_and_flatten_data_files"
-CONCURRENT_REQUESTS = 10  # Limit for concurrent requests to prevent overloading
+WATERMARKS_FILE = "member_watermarks.json"
 
 
-def fetch_clan_members(clan_name):
+async def fetch_clan_members(clan_name):
     """Fetch clan members from the Runescape clan hiscores."""
-    url = f"http://services.runescape.com/m=clan-hiscores/members_lite.ws?clanName={quote(clan_name)}"
-    logger.info(f"Fetching clan members from URL: {url}")
-    response = requests.get(url)
-    response.raise_for_status()  # Raise exception for HTTP errors
-    data = response.text.strip().split("\n")
-
-    members = []
-    for line in data[1:]:  # Skip the header line
-        name, rank, experience, kills = line.split(",")
-        name = name.replace("\xa0", " ").strip()
-        members.append({
-            "name": name,
-            "rank": rank.strip(),
-            "experience": int(experience.strip()),
-            "kills": int(kills.strip())
-        })
+    logger.info(f"Fetching clan members for clan: {clan_name}")
+    members = await fetch_clan_members_lite(clan_name)
+    if not members:
+        raise RuntimeError(f"No clan members returned for {clan_name}")
     logger.info(f"Fetched {len(members)} clan members.")
     return pd.DataFrame(members)
 
 
-def get_member_activities(member_name, number_of_activities=20):
-    """Fetch activities for a single member (Serial Version)."""
-    url = f"https://apps.runescape.com/runemetrics/profile/profile?user={quote(member_name)}&activities={number_of_activities}"
-    logger.debug(f"Fetching activities for member: {member_name}")
-    response = requests.get(url)
-    if response.status_code != 200:
-        logger.warning(f"Failed to fetch activities for {member_name}. Status Code: {response.status_code}")
-        return pd.DataFrame()  # Return empty DataFrame on failure
-
-    data = response.json()
+def flatten_activities(member_name, data):
+    """Flatten a RuneMetrics profile payload into activity rows."""
     activities = data.get("activities", [])
 
     recent_activities = []
@@ -94,92 +72,87 @@ def get_member_activities(member_name, number_of_activities=20):
         except Exception as e:
             logger.error(f"Error parsing activity for {member_name}: {e}")
             continue
-    logger.debug(f"Retrieved {len(recent_activities)} activities for {member_name}")
     return pd.DataFrame(recent_activities)
 
 
-async def fetch_member_activities_async(session, member_name, number_of_activities=20, semaphore=None):
-    """Fetch activities for a single member asynchronously."""
-    url = f"https://apps.runescape.com/runemetrics/profile/profile?user={quote(member_name)}&activities={number_of_activities}"
-    if semaphore:
-        async with semaphore:
-            return await _fetch_activity(session, member_name, url)
+async def fetch_member_activities_async(member_name, number_of_activities=20, limiter=None):
+    """Fetch activities for a single member asynchronously, inside a limiter slot when one is given."""
+    if limiter:
+        async with limiter:
+            return await _fetch_activity(member_name, number_of_activities)
     else:
-        return await _fetch_activity(session, member_name, url)
+        return await _fetch_activity(member_name, number_of_activities)
 
 
-async def _fetch_activity(session, member_name, url):
-    """Helper function to perform the actual HTTP request."""
+async def _fetch_activity(member_name, number_of_activities):
+    """Helper function to perform the actual HTTP request through the shared client."""
     try:
-        async with session.get(url) as response:
-            if response.status != 200:
-                logger.warning(f"Failed to fetch activities for {member_name}. Status Code: {response.status}")
-                return pd.DataFrame()
-            data = await response.json()
-            activities = data.get("activities", [])
-
-            recent_activities = []
-            for activity in activities:
-                try:
-                    activity_date = datetime.strptime(activity["date"], "%d-%b-%Y %H:%M")
-                    recent_activities.append({
-                        "name": data.get("name", member_name),
-                        "date": activity["date"],
-                        "details": activity["details"],
-                        "text": activity["text"]
-                        #"activity_type": activity[None]
-                        #"status": activity[None]
-                    })
-                except Exception as e:
-                    logger.error(f"Error parsing activity for {member_name}: {e}")
-                    continue
-            logger.info(f"Retrieved {len(recent_activities)} activities for {member_name}")
-            return pd.DataFrame(recent_activities)
+        data = await fetch_runemetrics_profile(member_name, number_of_activities)
+        if data is None:
+            logger.warning(f"Failed to fetch activities for {member_name}.")
+            return pd.DataFrame()
+        activities_df = flatten_activities(member_name, data)
+        logger.info(f"Retrieved {len(activities_df)} activities for {member_name}")
+        return activities_df
     except Exception as e:
         logger.error(f"Exception occurred while fetching activities for {member_name}: {e}")
         return pd.DataFrame()
 
 
-async def fetch_all_activities_concurrently(members, number_of_activities=20):
-    """Fetch activities for all members concurrently."""
+async def fetch_new_member_activities(member_name, watermarks, limiter=None):
+    """Fetch only the activities newer than the member's high-water mark."""
+    requested = watermarks.activities_to_request(member_name)
+    activities_df = await fetch_member_activities_async(member_name, requested, limiter)
+    new_df, complete = watermarks.filter_new(member_name, activities_df)
+    if not complete and requested < MAX_ACTIVITIES:
+        # Every activity we got was new, so more may have been missed; widen the request once
+        logger.info(f"No overlap with the high-water mark for {member_name}; refetching {MAX_ACTIVITIES} activities.")
+        activities_df = await fetch_member_activities_async(member_name, MAX_ACTIVITIES, limiter)
+        new_df, _ = watermarks.filter_new(member_name, activities_df)
+    return new_df, requested
+
+
+async def fetch_all_activities_concurrently(members, number_of_activities=20, watermarks=None):
+    """Fetch activities for all members concurrently; only new ones when watermarks are given."""
     logger.info("Starting concurrent fetching of member activities.")
-    timeout = ClientTimeout(total=60)  # Adjust as needed
-    semaphore = Semaphore(CONCURRENT_REQUESTS)
-    async with ClientSession(timeout=timeout) as session:
+    # Concurrency adapts to how RuneMetrics responds instead of a fixed semaphore size
+    limiter = AdaptiveLimiter("runemetrics")
+    if watermarks is None:
         tasks = [
-            fetch_member_activities_async(session, member, number_of_activities, semaphore)
+            fetch_member_activities_async(member, number_of_activities, limiter)
             for member in members
         ]
         results = await asyncio.gather(*tasks)
+    else:
+        tasks = [fetch_new_member_activities(member, watermarks, limiter) for member in members]
+        fetched = await asyncio.gather(*tasks)
+        results = [new_df for new_df, _ in fetched]
+        requested = sum(count for _, count in fetched)
+        for member, new_df in zip(members, results):
+            watermarks.update(member, new_df)
+        logger.info(f"Requested {requested} activities for {len(members)} members "
+                    f"(full refresh would be {len(members) * MAX_ACTIVITIES}); "
+                    f"{sum(len(df) for df in results)} are new.")
+    limiter.summary()
     logger.info("Completed concurrent fetching of member activities.")
-    return pd.concat(results, ignore_index=True)
-
-
-def load_recent_members(data_dir, days=7):
-    """Load recently active members based on activities data."""
-    activities_path = os.path.join(data_dir, OUTPUT_DIR, ACTIVITIES_PICKLE)
-    if not os.path.exists(activities_path):
-        logger.info("Activities data not found. Fetching all members.")
-        return None  # Indicate that all members should be fetched
-
-    activities_df = pd.read_pickle(activities_path)
-    activities_df['date'] = pd.to_datetime(activities_df['date'], format="%d-%b-%Y %H:%M")
-    recent_threshold = datetime.now() - timedelta(days=days)
-    recent_members = activities_df[activities_df['date'] >= recent_threshold]['name'].unique().tolist()
-    logger.info(f"Identified {len(recent_members)} recently active members.")
-    return recent_members
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
 
 
-async def main_async(clan_name, active_only, concurrent):
+async def main_async(clan_name, active_only, concurrent, full=False):
     """Main asynchronous function to orchestrate data fetching and saving."""
     data_dir = os.path.dirname(__file__)
     output_dir = os.path.join(data_dir, OUTPUT_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    watermarks = None if full else MemberWatermarks(os.path.join(output_dir, WATERMARKS_FILE))
 
     # Fetch clan members
-    members_df = fetch_clan_members(clan_name)
+    members_df = await fetch_clan_members(clan_name)
 
     if active_only:
-        recent_members = load_recent_members(data_dir)
+        if watermarks is not None and watermarks.marks:
+            recent_members = watermarks.recent_members()
+        else:
+            recent_members = load_recent_members(data_dir)
         if recent_members is not None:
             members_df = members_df[members_df['name'].isin(recent_members)]
             logger.info(f"Fetching activities for {len(members_df)} recently active members.")
@@ -194,66 +167,75 @@ async def main_async(clan_name, active_only, concurrent):
 
     if concurrent:
         # Run the asynchronous concurrent fetching
-        activities_df = await fetch_all_activities_concurrently(names, number_of_activities=20)
+        activities_df = await fetch_all_activities_concurrently(names, number_of_activities=20, watermarks=watermarks)
     else:
         # Run the serial fetching
         logger.info("Starting serial fetching of member activities.")
         activities_df = pd.DataFrame()
         for name in names:
-            activities = get_member_activities(name, number_of_activities=20)
-            logger.info(f"Retrieved {len(activities)} activities for {name}")
+            if watermarks is None:
+                activities = await fetch_member_activities_async(name, number_of_activities=20)
+            else:
+                activities, _ = await fetch_new_member_activities(name, watermarks)
+                watermarks.update(name, activities)
             activities_df = pd.concat([activities_df, activities], ignore_index=True)
         logger.info("Completed serial fetching of member activities.")
 
     # Save DataFrames
     save_dataframes(members_df, activities_df, output_dir)
+    # Only advance the marks once the new activities are safely handed off to the insert step
+    if watermarks is not None:
+        watermarks.save()
     logger.info("Data insertion process completed.")
+    return members_df, activities_df
 
 
 def save_dataframes(members_df, activities_df, output_dir):
-    """Save DataFrames to pickle files."""
-    os.makedirs(output_dir, exist_ok=True)
-    members_path = os.path.join(output_dir, MEMBERS_PICKLE)
-    activities_path = os.path.join(output_dir, ACTIVITIES_PICKLE)
+    """Append the members snapshot and new activities as NDJSON chunks for the insert stage."""
+    store = ChunkStore(output_dir)
+    activities_df = activities_df.copy()
     activities_df['activity_type'] = None
     activities_df['status'] = None
-    members_df.to_pickle(members_path)
-    activities_df.to_pickle(activities_path)
-    logger.info(f"Data saved to {members_path} and {activities_path}")
+    members_paths = store.append(MEMBERS_DATASET, members_df)
+    activities_paths = store.append(ACTIVITIES_DATASET, activities_df, partition_column='date',
+                                    date_format=ACTIVITY_DATE_FORMAT)
+    logger.info(f"Data saved to {len(members_paths)} members and {len(activities_paths)} activities chunk(s) in {output_dir}")
 
 
 def load_recent_members(data_dir, days=7):
-    """Load recently active members based on activities data."""
-    activities_path = os.path.join(data_dir, OUTPUT_DIR, ACTIVITIES_PICKLE)
-    if not os.path.exists(activities_path):
+    """Load recently active members from the activity chunks of the last `days` days only."""
+    store = ChunkStore(os.path.join(data_dir, OUTPUT_DIR))
+    since = datetime.now() - timedelta(days=days)
+    paths = store.chunks(ACTIVITIES_DATASET, since=since)
+    if not paths:
         logger.info("Activities data not found. Fetching all members.")
         return None  # Indicate that all members should be fetched
 
-    activities_df = pd.read_pickle(activities_path)
-    activities_df['date'] = pd.to_datetime(activities_df['date'], format="%d-%b-%Y %H:%M")
-    #activities_df['activity_type'] = None
-    #activities_df['status'] = None
-    recent_threshold = datetime.now() - timedelta(days=days)
-    recent_members = activities_df[activities_df['date'] >= recent_threshold]['name'].unique().tolist()
+    recent_members = set()
+    for record in store.iter_records(ACTIVITIES_DATASET, paths=paths):
+        if datetime.strptime(record["date"], ACTIVITY_DATE_FORMAT) >= since:
+            recent_members.add(record["name"])
     logger.info(f"Identified {len(recent_members)} recently active members.")
-    return recent_members
+    return list(recent_members)
 
 
-def main(clan_name, active_only, concurrent):
+def main(clan_name, active_only, concurrent, full=False):
     """Entry point for the script."""
     try:
-        asyncio.run(main_async(clan_name, active_only, concurrent))
+        asyncio.run(run_and_close(main_async(clan_name, active_only, concurrent, full)))
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         exit(1)
 
 
 if __name__ == "__main__":
+    print("--concurrent flag to get all names concurrently")
     parser = argparse.ArgumentParser(description="Fetch and flatten clan member data.")
     parser.add_argument('--active', action='store_true', help='Fetch activities for recently active members only.')
     parser.add_argument('--concurrent', action='store_true', help='Enable concurrent fetching of member activities.')
     parser.add_argument('--clan', type=str, default=DEFAULT_CLAN_NAME, help='Name of the clan to fetch data for.')
+    parser.add_argument('--full', action='store_true', help='Ignore high-water marks and refetch 20 activities per member.')
     args = parser.parse_args()
 
-    main(clan_name=args.clan, active_only=args.active, concurrent=args.concurrent)
+    main(clan_name=args.clan, active_only=args.active, concurrent=args.concurrent, full=args.full)
 
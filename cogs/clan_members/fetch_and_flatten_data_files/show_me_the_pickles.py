@@ -1,10 +1,13 @@
+import glob
+import os
 import pandas as pd
 from tabulate import tabulate
 import textwrap
 import pydoc
 
-# Load the DataFrame from the pickle file
-df = pd.read_pickle("activities_data.pkl")
+# Load the most recent activities chunk written by fetch_and_flatten_data.py
+chunks = sorted(glob.glob("activities/date=*/part-*.ndjson"), key=os.path.basename)
+df = pd.read_json(chunks[-1], orient="records", lines=True, dtype=False) if chunks else pd.DataFrame()
 
 # Wrap text in each cell to a max width of 50 characters
 wrapped_df = df.applymap(lambda x: '\n'.join(textwrap.wrap(str(x), width=50)))
@@ -1,34 +1,17 @@
-import requests
-from urllib.parse import quote
 from datetime import datetime, timedelta
 
-def fetch_clan_members(clan_name):
-    url = f"http://services.runescape.com/m=clan-hiscores/members_lite.ws?clanName={quote(clan_name)}"
-    response = requests.get(url)
-    data = response.text.strip().split("\n")
+from cogs.common.rs_api import fetch_clan_members_lite, fetch_runemetrics_profile
 
-    members = []
-    for line in data[1:]:
-        name, rank, experience, kills = line.split(",")
-        name = name.replace("\xa0", " ")
-        members.append({
-            "name": name,
-            "rank": rank,
-            "experience": int(experience),
-            "kills": int(kills)
-        })
-    #print(members)
-    return members
+async def fetch_clan_members(clan_name):
+    return await fetch_clan_members_lite(clan_name)
 
-def get_member_activities(member_name, number_of_activities = 5):
+async def get_member_activities(member_name, number_of_activities = 5):
     thirty_days_ago = datetime.now() - timedelta(days=30)
     if number_of_activities > 10:
         number_of_activities = 10
-    url = f"https://apps.runescape.com/runemetrics/profile/profile?user={quote(member_name)}&activities={number_of_activities}"
-    response = requests.get(url)
 
     # Parse JSON response
-    data = response.json()
+    data = await fetch_runemetrics_profile(member_name, number_of_activities) or {}
 
     # Extract 'name' and 'activities', handle missing 'activities' gracefully
     name = data.get("name", member_name)
@@ -43,14 +26,7 @@ def get_member_activities(member_name, number_of_activities = 5):
 
         #if len(recent_activities) >= 10:
         #    break
-    print(recent_activities)
     return {
         "name": name,
         "activities": recent_activities
     }
-
-
-fetch_clan_members("10s")
-member_activity = get_member_activities("Vogue")
-#print(member_activity) 
-
@@ -1,19 +1,13 @@
 # insert_data.py
 import os
-import json
-import pandas as pd
-from sqlalchemy import create_engine, Table, MetaData, select
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Table, MetaData
 from datetime import datetime
 
-# Load database configuration from dbconfig.json in the parent directory
-config_path = os.path.join(os.path.expanduser("~"), 'discordbot10s', 'dbconfig.json')
-with open(config_path) as config_file:
-    config = json.load(config_file)
+from cogs.clan_members.chunk_store import ChunkStore
+from cogs.common.bulk_upsert import DEFAULT_BATCH_SIZE, BulkResult, bulk_upsert
+from cogs.common.db import get_engine
 
-# Create the SQLAlchemy engine using the loaded configuration
-engine = create_engine(f"postgresql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}")
+CHUNK_CONSUMER = "insert_data"
 
 def log_message(message, row_data=None):
     """Logs informational messages with optional row data for context."""
@@ -37,64 +31,76 @@ def adjust_dataframe_structure(df, table_columns):
     df = df[[col for col in df.columns if col in table_columns]]
     return df
 
-def insert_data(engine, df, table_name, unique_column=None):
+def insert_data(engine, df, table_name, unique_column=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Bulk insert a DataFrame: members are upserted on unique_column, other tables skip conflicting rows."""
     metadata = MetaData()
     table = Table(table_name, metadata, autoload_with=engine)
     table_columns = [column.name for column in table.columns]
 
     df = adjust_dataframe_structure(df, table_columns)
 
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            try:
-                if table_name == "members" and unique_column:
-                    # Upsert for members table to handle changes
-                    insert_stmt = insert(table).values(**row.to_dict())
-                    upsert_stmt = insert_stmt.on_conflict_do_update(
-                        index_elements=[unique_column],
-                        set_={col: insert_stmt.excluded[col] for col in row.index if col != unique_column}
-                    )
-                    conn.execute(upsert_stmt)
-                    log_message(f"Upserted row for {unique_column}: {row[unique_column]}")
-                elif table_name == "activities":
-                    # Insert for activities with conflict handling
-                    insert_stmt = insert(table).values(**row.to_dict())
-                    do_nothing_stmt = insert_stmt.on_conflict_do_nothing()
-                    result = conn.execute(do_nothing_stmt)
-
-                    # Check if the row was inserted by counting affected rows
-                    if result.rowcount == 0:
-                        log_conflict("Conflict skipped for activity row", row.to_dict())
-                    else:
-                        log_message(f"Inserted activity row for member: {row.get('member_name', row.get('name'))}")
-                else:
-                    # Generic insert for other tables if any
-                    conn.execute(insert(table).values(**row.to_dict()))
-                    log_message(f"Inserted row into {table_name}: {row.to_dict()}")
-
-            except SQLAlchemyError as e:
-                log_error(f"Database error while inserting row for {unique_column}: {row.get(unique_column)}", row.to_dict())
-                log_error(str(e))
+    if table_name == "members" and unique_column:
+        # Upsert for members table to handle changes
+        result = bulk_upsert(engine, table_name, df, conflict_columns=[unique_column],
+                             batch_size=batch_size, table=table)
+        log_message(f"Members upsert on {unique_column}: {result.inserted} inserted, "
+                    f"{result.updated} updated, {result.skipped} unchanged, {result.failed} failed")
+    else:
+        # Insert for activities (and any other table) with conflict handling
+        result = bulk_upsert(engine, table_name, df, conflict_columns=None, batch_size=batch_size, table=table)
+        log_message(f"Inserted {result.inserted} rows into {table_name}; "
+                    f"{result.skipped} skipped on conflict, {result.failed} failed")
+        if result.skipped:
+            log_conflict(f"Conflict skipped for {result.skipped} {table_name} rows", None)
+
+    if result.failed:
+        log_error(f"{result.failed} rows could not be written to {table_name}; see the errors above.")
+    return result
 
 def log_conflict(message, row_data, log_file="data_insert_conflict_log.txt"):
     """Logs skipped rows due to conflict to a specified log file."""
     with open(log_file, "a") as file:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         file.write(f"[{timestamp}] CONFLICT: {message}\n")
-        file.write(f"Row Data: {row_data}\n\n")
-
-# Load data from the pickle files
-data_dir = os.path.dirname(__file__)
-members_df = pd.read_pickle(os.path.join(data_dir, "./fetch_and_flatten_data_files/members_data.pkl"))
-activities_df = pd.read_pickle(os.path.join(data_dir, "./fetch_and_flatten_data_files/activities_data.pkl"))
-
-# Adjust column names to match the database structure
-members_df = members_df.rename(columns={"name": "name"})
-activities_df = activities_df.rename(columns={"name": "member_name"})
-
-# Insert the data into the respective tables
-insert_data(engine, members_df, 'members', unique_column="name")
-insert_data(engine, activities_df, 'activities')
-
-print("Data insertion process completed.")
-
+        if row_data is not None:
+            file.write(f"Row Data: {row_data}\n")
+        file.write("\n")
+
+def insert_from_chunks(engine, output_dir=os.path.join(os.path.dirname(__file__), "fetch_and_flatten_data_files")):
+    """Insert the latest members snapshot and every activity chunk not yet inserted; returns the activities result."""
+    # Stream the chunks written by fetch_and_flatten_data.py
+    store = ChunkStore(output_dir)
+    members_df = store.latest("members")
+
+    # Adjust column names to match the database structure
+    members_df = members_df.rename(columns={"name": "name"})
+
+    # Insert the data into the respective tables
+    if not members_df.empty:
+        insert_data(engine, members_df, 'members', unique_column="name")
+
+    # Only activity chunks this step has not inserted yet, one batch at a time. The fetch watermarks have
+    # already moved past these activities, so a chunk with failed rows stays unconsumed and is retried next
+    # run (rows that did go in are skipped on conflict).
+    totals = BulkResult()
+    activity_chunks = store.unconsumed("activities", CHUNK_CONSUMER)
+    inserted_chunks = []
+    for path in activity_chunks:
+        failed = 0
+        for activities_df in store.iter_batches("activities", batch_size=DEFAULT_BATCH_SIZE, paths=[path]):
+            activities_df = activities_df.rename(columns={"name": "member_name"})
+            result = insert_data(engine, activities_df, 'activities')
+            failed += result.failed
+            totals.add(result)
+        if failed:
+            log_error(f"{failed} rows from {path} failed; leaving the chunk to be retried next run.")
+        else:
+            inserted_chunks.append(path)
+    store.mark_consumed("activities", CHUNK_CONSUMER, inserted_chunks)
+
+    log_message(f"Inserted activities from {len(inserted_chunks)} of {len(activity_chunks)} chunks: {totals}")
+    return totals
+
+if __name__ == "__main__":
+    insert_from_chunks(get_engine())
+    print("Data insertion process completed.")
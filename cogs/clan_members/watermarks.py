@@ -0,0 +1,109 @@
+# watermarks.py
+import json
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_DATE_FORMAT = "%d-%b-%Y %H:%M"
+MAX_ACTIVITIES = 20  # RuneMetrics returns at most 20 activities per profile
+MIN_ACTIVITIES = 2  # Always ask for at least one already-seen activity to prove nothing was missed
+RATE_SMOOTHING = 0.3  # Weight of the latest run in the per-member activity rate average
+SAFETY_FACTOR = 2.0  # Request this many times the expected number of new activities
+
+
+class MemberWatermarks:
+    """
+    Per-member high-water marks for incremental RuneMetrics ingestion.
+
+    For every member we keep the timestamp of the newest ingested activity, the texts seen at that
+    minute (RuneMetrics dates have minute resolution) and a smoothed activities-per-hour rate used to
+    size the next request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.marks = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.marks = json.load(f)
+            logger.info(f"Loaded high-water marks for {len(self.marks)} members.")
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.marks, f)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved high-water marks for {len(self.marks)} members to {self.path}")
+
+    def recent_members(self, days=7, now=None):
+        """Members whose newest ingested activity falls within the last `days` days."""
+        threshold = (now or datetime.now()) - timedelta(days=days)
+        return [
+            member for member, mark in self.marks.items()
+            if mark.get("last_activity") and datetime.fromisoformat(mark["last_activity"]) >= threshold
+        ]
+
+    def activities_to_request(self, member, now=None):
+        """Size the RuneMetrics request from the member's recent activity rate."""
+        mark = self.marks.get(member)
+        if mark is None:
+            return MAX_ACTIVITIES
+        now = now or datetime.now()
+        hours = max((now - datetime.fromisoformat(mark["last_run"])).total_seconds() / 3600, 0)
+        expected = mark.get("rate_per_hour", 0.0) * hours
+        return int(min(MAX_ACTIVITIES, max(MIN_ACTIVITIES, math.ceil(expected * SAFETY_FACTOR) + 1)))
+
+    def filter_new(self, member, activities_df):
+        """
+        Keep only activities newer than the member's mark.
+
+        Returns (new_activities_df, complete); complete is False when every returned activity was new,
+        meaning older unseen activities may exist beyond what was requested.
+        """
+        if activities_df.empty:
+            return activities_df, True
+        mark = self.marks.get(member)
+        if mark is None or mark.get("last_activity") is None:
+            return activities_df, len(activities_df) < MAX_ACTIVITIES
+
+        dates = pd.to_datetime(activities_df["date"], format=ACTIVITY_DATE_FORMAT)
+        last_activity = pd.Timestamp(mark["last_activity"])
+        seen_texts = set(mark.get("last_texts", []))
+        is_new = (dates > last_activity) | ((dates == last_activity) & ~activities_df["text"].isin(seen_texts))
+        return activities_df[is_new], not bool(is_new.all())
+
+    def update(self, member, new_activities_df, now=None):
+        """Advance the member's mark past the newly ingested activities and refresh their activity rate."""
+        now = now or datetime.now()
+        mark = self.marks.get(member, {})
+        previous_run = mark.get("last_run")
+        new_count = len(new_activities_df)
+
+        if new_count:
+            dates = pd.to_datetime(new_activities_df["date"], format=ACTIVITY_DATE_FORMAT)
+            newest = dates.max()
+            texts = new_activities_df.loc[dates == newest, "text"].tolist()
+            if mark.get("last_activity") == newest.isoformat():
+                texts = list(set(texts) | set(mark.get("last_texts", [])))
+            mark["last_activity"] = newest.isoformat()
+            mark["last_texts"] = texts
+
+        if previous_run is not None:
+            hours = max((now - datetime.fromisoformat(previous_run)).total_seconds() / 3600, 1 / 60)
+            observed = new_count / hours
+            mark["rate_per_hour"] = (1 - RATE_SMOOTHING) * mark.get("rate_per_hour", observed) + RATE_SMOOTHING * observed
+        elif new_count:
+            # First sighting: estimate the rate from the span covered by the activities we were given
+            oldest = pd.to_datetime(new_activities_df["date"], format=ACTIVITY_DATE_FORMAT).min()
+            hours = max((pd.Timestamp(now) - oldest).total_seconds() / 3600, 1.0)
+            mark["rate_per_hour"] = new_count / hours
+        else:
+            mark.setdefault("rate_per_hour", 0.0)
+
+        mark["last_run"] = now.isoformat()
+        self.marks[member] = mark
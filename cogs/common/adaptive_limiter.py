@@ -0,0 +1,123 @@
+# adaptive_limiter.py
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Constants
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 24  # Still capped by the per-host limits in http_client
+BACKOFF_FACTOR = 0.5  # Multiplicative decrease on 429/5xx/timeouts
+LATENCY_TOLERANCE = 2.0  # Stop growing once latency exceeds this multiple of the best seen
+
+# The limiter whose slot the current task holds; the HTTP client reports each attempt's outcome to it
+_active_limiter = ContextVar("active_limiter", default=None)
+
+
+def report_outcome(throttled, latency, retry_after=None):
+    """Feed one HTTP attempt's outcome to the limiter held by the current task, if any."""
+    limiter = _active_limiter.get()
+    if limiter is not None:
+        limiter.record(throttled, latency, retry_after)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for bulk fetches, used like a semaphore (``async with limiter:``).
+
+    The limit grows by one slot per full window of fast, successful responses and is halved when the
+    server throttles (429/5xx) or times out, at most once per window. A Retry-After header pauses new
+    requests until it has passed.
+    """
+
+    def __init__(self, name, initial=INITIAL_CONCURRENCY, min_limit=MIN_CONCURRENCY, max_limit=MAX_CONCURRENCY,
+                 backoff_factor=BACKOFF_FACTOR, latency_tolerance=LATENCY_TOLERANCE):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.best_latency = None
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        self._started = None
+        self._tokens = {}
+
+        # Counters for the run summary
+        self.requests = 0
+        self.throttled = 0
+        self.peak_limit = int(self.limit)
+        self._limit_total = 0.0
+
+    @property
+    def current(self):
+        return max(self.min_limit, int(self.limit))
+
+    async def __aenter__(self):
+        async with self._condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < self.current:
+                    break
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=wait if wait > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+        if self._started is None:
+            self._started = time.monotonic()
+        self._tokens[asyncio.current_task()] = _active_limiter.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        token = self._tokens.pop(asyncio.current_task(), None)
+        if token is not None:
+            _active_limiter.reset(token)
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record(self, throttled, latency, retry_after=None):
+        """Adjust the limit after one HTTP attempt."""
+        now = time.monotonic()
+        self.requests += 1
+        self._limit_total += self.limit
+
+        if throttled:
+            self.throttled += 1
+            if retry_after:
+                try:
+                    self.paused_until = max(self.paused_until, now + float(retry_after))
+                except ValueError:
+                    pass
+            # Responses to requests sent before the last decrease reflect the old limit; don't cut twice
+            if now - self._last_decrease >= (self.best_latency or latency):
+                previous = self.current
+                self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                self._last_decrease = now
+                logger.info(f"{self.name}: throttled, concurrency {previous} -> {self.current}")
+            return
+
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        if latency <= self.best_latency * self.latency_tolerance and self.in_flight >= self.current:
+            # Additive increase: +1 slot once a full window of requests has completed quickly
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.peak_limit = max(self.peak_limit, self.current)
+
+    def summary(self):
+        """Log the concurrency the run settled on and its throughput."""
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        average = self._limit_total / self.requests if self.requests else self.limit
+        rate = self.requests / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"{self.name}: {self.requests} requests in {elapsed:.1f}s ({rate:.1f} req/s), "
+            f"concurrency avg {average:.1f} / peak {self.peak_limit} / final {self.current}, "
+            f"{self.throttled} throttled"
+        )
@@ -0,0 +1,143 @@
+# bulk_upsert.py
+import logging
+
+import pandas as pd
+from sqlalchemy import Table, MetaData, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+class BulkResult:
+    """Row counts reported by bulk_upsert."""
+    __slots__ = ("inserted", "updated", "skipped", "failed")
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def add(self, other):
+        """Accumulate another result's counts into this one."""
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.skipped += other.skipped
+        self.failed += other.failed
+        return self
+
+    @property
+    def total(self):
+        return self.inserted + self.updated + self.skipped + self.failed
+
+    def __repr__(self):
+        return (f"BulkResult(inserted={self.inserted}, updated={self.updated}, "
+                f"skipped={self.skipped}, failed={self.failed})")
+
+
+def dataframe_to_rows(df, table_columns):
+    """
+    Align a DataFrame with the table's columns and convert it to plain Python row dicts.
+
+    Columns missing from the DataFrame are omitted (so server defaults such as the serial id apply),
+    NaN/NaT become None and numpy scalars become Python scalars, which psycopg2 can adapt.
+    """
+    df = df[[col for col in df.columns if col in table_columns]]
+    df = df.astype(object).where(pd.notna(df), None)
+    return df.to_dict("records")
+
+
+def _dedupe(rows, conflict_columns):
+    """Keep the last row per conflict key; Postgres rejects a VALUES list that hits the same row twice."""
+    if not conflict_columns:
+        return rows
+    unique = {}
+    for row in rows:
+        unique[tuple(row.get(col) for col in conflict_columns)] = row
+    return list(unique.values())
+
+
+def _build_statement(table, rows, conflict_columns, update_columns):
+    stmt = insert(table).values(rows)
+    if conflict_columns is None:
+        stmt = stmt.on_conflict_do_nothing()
+    elif not update_columns:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+    else:
+        # Only touch rows whose content actually changed, so unchanged rows count as skipped
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={col: stmt.excluded[col] for col in update_columns},
+            where=or_(*[table.c[col].is_distinct_from(stmt.excluded[col]) for col in update_columns])
+        )
+    # xmax is 0 for freshly inserted tuples and non-zero for tuples rewritten by ON CONFLICT DO UPDATE
+    return stmt.returning(literal_column("(xmax = 0)").label("inserted"))
+
+
+def _write_batch(engine, table, rows, conflict_columns, update_columns, result, min_split):
+    """Write one batch in its own transaction, bisecting on failure to isolate the offending rows."""
+    try:
+        with engine.begin() as conn:
+            returned = conn.execute(_build_statement(table, rows, conflict_columns, update_columns)).fetchall()
+    except SQLAlchemyError as e:
+        if len(rows) <= min_split:
+            result.failed += len(rows)
+            logger.error(f"Failed to write {len(rows)} rows to {table.name}: {e}")
+            if len(rows) == 1:
+                logger.error(f"Row Data: {rows[0]}")
+            return
+        middle = len(rows) // 2
+        _write_batch(engine, table, rows[:middle], conflict_columns, update_columns, result, min_split)
+        _write_batch(engine, table, rows[middle:], conflict_columns, update_columns, result, min_split)
+        return
+
+    inserted = sum(1 for row in returned if row.inserted)
+    result.inserted += inserted
+    result.updated += len(returned) - inserted
+    result.skipped += len(rows) - len(returned)
+
+
+def bulk_upsert(engine, table_name, data, conflict_columns=None, update_columns=None,
+                batch_size=DEFAULT_BATCH_SIZE, min_split=1, table=None):
+    """
+    Insert or merge rows into a table using multi-row INSERT ... ON CONFLICT statements.
+
+    :param engine: SQLAlchemy engine.
+    :param table_name: Name of the target table (reflected unless table is given).
+    :param data: DataFrame or list of row dicts.
+    :param conflict_columns: Unique columns used for ON CONFLICT. None means DO NOTHING on any constraint.
+    :param update_columns: Columns to overwrite on conflict. Defaults to every non-conflict column present;
+                           pass [] to skip conflicting rows instead of updating them.
+    :param batch_size: Rows per statement/transaction.
+    :param min_split: A failing batch is bisected until it is this small, then its rows are counted as failed.
+    :return: BulkResult with inserted/updated/skipped/failed counts.
+    """
+    if table is None:
+        table = Table(table_name, MetaData(), autoload_with=engine)
+    table_columns = [column.name for column in table.columns]
+
+    if isinstance(data, pd.DataFrame):
+        rows = dataframe_to_rows(data, table_columns)
+    else:
+        rows = [{col: value for col, value in row.items() if col in table_columns} for row in data]
+
+    result = BulkResult()
+    if not rows:
+        return result
+
+    deduped = _dedupe(rows, conflict_columns)
+    result.skipped += len(rows) - len(deduped)
+
+    if conflict_columns is not None and update_columns is None:
+        update_columns = [col for col in deduped[0] if col not in conflict_columns and col != "id"]
+
+    for start in range(0, len(deduped), batch_size):
+        batch = deduped[start:start + batch_size]
+        _write_batch(engine, table, batch, conflict_columns, update_columns, result, min_split)
+        logger.info(f"{table.name}: processed {min(start + batch_size, len(deduped))}/{len(deduped)} rows")
+
+    logger.info(f"{table.name}: {result}")
+    return result
@@ -0,0 +1,29 @@
+# db.py
+import json
+import os
+
+from sqlalchemy import create_engine
+
+DB_CONFIG_PATH = os.path.join(os.path.expanduser("~"), 'discordbot10s', 'dbconfig.json')
+
+_engine = None
+
+
+def load_db_config(config_path=DB_CONFIG_PATH):
+    """Load the database settings from dbconfig.json."""
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Database configuration file not found: {config_path}")
+    with open(config_path) as config_file:
+        return json.load(config_file)
+
+
+def get_engine():
+    """Return the process-wide SQLAlchemy engine (and its connection pool), creating it on first use."""
+    global _engine
+    if _engine is None:
+        config = load_db_config()
+        _engine = create_engine(
+            f"postgresql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}",
+            pool_pre_ping=True,
+        )
+    return _engine
@@ -0,0 +1,124 @@
+# hiscores.py
+import logging
+import time
+
+import numpy as np
+
+from cogs.common.experience import virtual_levels
+from cogs.common.rs_api import fetch_hiscore_lite
+
+logger = logging.getLogger(__name__)
+
+# Skill and activity names in index_lite.ws order
+SKILLS = [
+    "Overall", "Attack", "Defence", "Strength", "Constitution", "Ranged", "Prayer",
+    "Magic", "Cooking", "Woodcutting", "Fletching", "Fishing", "Firemaking", "Crafting",
+    "Smithing", "Mining", "Herblore", "Agility", "Thieving", "Slayer", "Farming",
+    "Runecrafting", "Hunter", "Construction", "Summoning", "Dungeoneering", "Divination",
+    "Invention", "Archaeology", "Necromancy"
+]
+
+ACTIVITIES = [
+    "Bounty Hunter", "B.H. Rogues", "Dominion Tower", "The Crucible", "Castle Wars games",
+    "B.A. Attackers", "B.A. Defenders", "B.A. Collectors", "B.A. Healers", "Duel Tournament",
+    "Mobilising Armies", "Conquest", "Fist of Guthix", "GG: Athletics", "GG: Resource Race",
+    "WE2: Armadyl Lifetime Contrib", "WE2: Bandos Lifetime Contrib",
+    "WE2: Armadyl PvP kills", "WE2: Bandos PvP kills", "Heist Guard Level", "Heist Robber Level",
+    "CFP: 5 game average", "AF15: Cow Tipping", "AF15: Rat kills post-quest",
+    "RuneScore", "Clue Scrolls Easy", "Clue Scrolls Medium", "Clue Scrolls Hard",
+    "Clue Scrolls Elite", "Clue Scrolls Master"
+]
+
+SKILL_INDEX = {skill: index for index, skill in enumerate(SKILLS)}
+MISSING = -1  # The hiscores report unranked values as -1
+
+
+def apply_virtual_levels(levels, experience):
+    """virtual_levels() over a players x SKILLS matrix, leaving unranked entries untouched."""
+    known = (levels != MISSING) & (experience != MISSING)
+    return np.where(known, virtual_levels(SKILLS, levels, experience), levels)
+
+
+class PlayerStats:
+    """
+    One parsed index_lite.ws profile: int64 arrays indexed like SKILLS and ACTIVITIES.
+
+    Unranked entries keep the hiscores' -1. `level` is the virtual/elite level (see virtual_levels),
+    `hiscore_level` the capped level the hiscores report.
+    """
+    __slots__ = ("username", "retrieved_at", "rank", "hiscore_level", "experience",
+                 "activity_rank", "activity_score", "_level")
+
+    def __init__(self, username, retrieved_at, rank, hiscore_level, experience, activity_rank, activity_score):
+        self.username = username
+        self.retrieved_at = retrieved_at  # Epoch seconds
+        self.rank = rank
+        self.hiscore_level = hiscore_level
+        self.experience = experience
+        self.activity_rank = activity_rank
+        self.activity_score = activity_score
+        self._level = None
+
+    @property
+    def level(self):
+        if self._level is None:
+            self._level = apply_virtual_levels(self.hiscore_level[None, :], self.experience[None, :])[0]
+        return self._level
+
+    def skill(self, name):
+        """Return (rank, level, experience) for one skill."""
+        index = SKILL_INDEX[name]
+        return int(self.rank[index]), int(self.level[index]), int(self.experience[index])
+
+    def skill_rows(self):
+        """One dict per known skill (username, skill, rank, level, experience) for CSV/DB writers."""
+        return [
+            {"username": self.username, "skill": skill, "rank": int(self.rank[index]),
+             "level": int(self.level[index]), "experience": int(self.experience[index])}
+            for index, skill in enumerate(SKILLS) if self.experience[index] != MISSING
+        ]
+
+    def __repr__(self):
+        return f"PlayerStats({self.username!r}, overall={int(self.experience[0]):,} xp)"
+
+
+def _parse_rows(lines, width):
+    values = np.full((len(lines), width), MISSING, dtype=np.int64)
+    for row, line in enumerate(lines):
+        parts = line.split(",")
+        if len(parts) < width:
+            continue
+        try:
+            values[row] = [int(part) for part in parts[:width]]
+        except ValueError:
+            logger.warning(f"Unparseable hiscore line: {line}")
+    return values
+
+
+def parse_hiscore_lite(username, text, retrieved_at=None):
+    """Parse an index_lite.ws payload into PlayerStats, or None if it does not hold every skill."""
+    lines = text.strip().split("\n")
+    if len(lines) < len(SKILLS):
+        logger.warning(f"Insufficient data received for {username}. Expected {len(SKILLS)} lines, got {len(lines)}.")
+        return None
+
+    skills = _parse_rows(lines[:len(SKILLS)], 3)
+    activities = np.full((len(ACTIVITIES), 2), MISSING, dtype=np.int64)
+    activity_lines = lines[len(SKILLS):len(SKILLS) + len(ACTIVITIES)]
+    if activity_lines:
+        activities[:len(activity_lines)] = _parse_rows(activity_lines, 2)
+
+    return PlayerStats(
+        username,
+        int(time.time()) if retrieved_at is None else retrieved_at,
+        rank=skills[:, 0], hiscore_level=skills[:, 1], experience=skills[:, 2],
+        activity_rank=activities[:, 0], activity_score=activities[:, 1],
+    )
+
+
+async def fetch_stats(username):
+    """Fetch and parse a player's hiscores; None if they could not be retrieved or parsed."""
+    text = await fetch_hiscore_lite(username)
+    if text is None:
+        return None
+    return parse_hiscore_lite(username, text)
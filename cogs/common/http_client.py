@@ -0,0 +1,264 @@
+# http_client.py
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from multidict import CIMultiDict
+
+from cogs.common.adaptive_limiter import report_outcome
+
+logger = logging.getLogger(__name__)
+
+# Constants
+TOTAL_CONNECTIONS = 50  # Pool size shared by every host
+DEFAULT_HOST_LIMIT = 10  # Concurrent requests allowed per host unless overridden below
+HOST_LIMITS = {
+    "secure.runescape.com": 24,  # Bulk fetches adapt below this via AdaptiveLimiter
+    "apps.runescape.com": 24,
+    "services.runescape.com": 4,
+    "chisel.weirdgloop.org": 2,
+    "api.weirdgloop.org": 5,
+}
+REQUEST_TIMEOUT = 30  # seconds, per attempt
+RETRIES = 3
+BACKOFF_BASE = 1.0  # seconds, doubled on every retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "discordbot10s (RuneScape clan bot)"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class HttpResponse:
+    """Minimal response snapshot so callers never hold an open aiohttp connection."""
+    __slots__ = ("url", "status", "headers", "body", "digest")
+
+    def __init__(self, url, status, headers, body, digest=None):
+        self.url = url
+        self.status = status
+        self.headers = headers  # Case-insensitive, as servers vary in header casing
+        self.body = body
+        self.digest = digest  # Hex digest of a downloaded body, see RSHttpClient.download
+
+    @property
+    def ok(self):
+        return self.status == 200
+
+    def text(self, encoding="utf-8"):
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class RSHttpClient:
+    """Long-lived aiohttp client with pooled keep-alive connections, per-host limits and retry/backoff."""
+
+    def __init__(self, total_connections=TOTAL_CONNECTIONS, host_limits=None, default_host_limit=DEFAULT_HOST_LIMIT,
+                 timeout=REQUEST_TIMEOUT, retries=RETRIES, backoff_base=BACKOFF_BASE):
+        self.total_connections = total_connections
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_host_limit = default_host_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self._session = None
+        self._host_semaphores = {}
+
+    async def _get_session(self):
+        """Create the shared session lazily so it binds to the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit=self.total_connections,
+                limit_per_host=max(self.host_limits.values(), default=self.default_host_limit),
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    def _semaphore_for(self, url):
+        host = urlparse(url).hostname or ""
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_limits.get(host, self.default_host_limit))
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Exponential backoff with jitter, honouring Retry-After when the server sends one."""
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff_base * (2 ** (attempt - 1)) + random.uniform(0, self.backoff_base)
+
+    async def get(self, url, params=None, headers=None, retries=None):
+        """
+        GET a URL and return an HttpResponse, or None if every attempt failed.
+
+        4xx responses other than 429 are returned immediately (e.g. 404 for an unknown player),
+        while 429/5xx, timeouts and connection errors are retried with backoff.
+        """
+        retries = self.retries if retries is None else retries
+        session = await self._get_session()
+        semaphore = self._semaphore_for(url)
+
+        for attempt in range(1, retries + 1):
+            retry_after = None
+            try:
+                async with semaphore:
+                    started = time.monotonic()
+                    async with session.get(url, params=params, headers=headers) as response:
+                        body = await response.read()
+                        result = HttpResponse(str(response.url), response.status, CIMultiDict(response.headers), body)
+                throttled = result.status in RETRY_STATUSES
+                retry_after = result.headers.get("Retry-After")
+                report_outcome(throttled, time.monotonic() - started, retry_after)
+                if not throttled:
+                    return result
+                logger.warning(f"HTTP {result.status} from {url}. Attempt {attempt} of {retries}.")
+                if attempt == retries:
+                    return result
+            except asyncio.TimeoutError:
+                report_outcome(True, self.timeout)
+                logger.warning(f"Timeout fetching {url}. Attempt {attempt} of {retries}.")
+            except aiohttp.ClientError as e:
+                report_outcome(True, self.timeout)
+                logger.warning(f"Connection error fetching {url}: {e}. Attempt {attempt} of {retries}.")
+
+            if attempt < retries:
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        logger.error(f"All retry attempts failed for {url}.")
+        return None
+
+    async def download(self, url, path, headers=None, retries=None, compress=False, hash_name=None):
+        """
+        Stream a 200 response body to `path` (gzip-compressed if asked) without holding it in memory.
+        With `hash_name` (e.g. "sha256") the uncompressed body is hashed as it arrives into `digest`.
+
+        The file is written to a temporary name and moved into place once complete, so readers never see
+        a partial download. Returns an HttpResponse with an empty body (status and headers only) so callers
+        can inspect e.g. a 304, or None if every attempt failed.
+        """
+        retries = self.retries if retries is None else retries
+        session = await self._get_session()
+        semaphore = self._semaphore_for(url)
+
+        for attempt in range(1, retries + 1):
+            retry_after = None
+            try:
+                async with semaphore:
+                    started = time.monotonic()
+                    # Time out on a stalled read rather than on the whole transfer
+                    timeout = ClientTimeout(sock_read=self.timeout)
+                    async with session.get(url, headers=headers, timeout=timeout) as response:
+                        result = HttpResponse(str(response.url), response.status, CIMultiDict(response.headers), b"")
+                        if response.status == 200:
+                            result.digest = await self._save_body(response, path, compress, hash_name)
+                throttled = result.status in RETRY_STATUSES
+                retry_after = result.headers.get("Retry-After")
+                report_outcome(throttled, time.monotonic() - started, retry_after)
+                if not throttled:
+                    return result
+                logger.warning(f"HTTP {result.status} from {url}. Attempt {attempt} of {retries}.")
+                if attempt == retries:
+                    return result
+            except asyncio.TimeoutError:
+                report_outcome(True, self.timeout)
+                logger.warning(f"Timeout downloading {url}. Attempt {attempt} of {retries}.")
+            except aiohttp.ClientError as e:
+                report_outcome(True, self.timeout)
+                logger.warning(f"Connection error downloading {url}: {e}. Attempt {attempt} of {retries}.")
+
+            if attempt < retries:
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        logger.error(f"All retry attempts failed for {url}.")
+        return None
+
+    @staticmethod
+    async def _save_body(response, path, compress, hash_name):
+        """
+        Stream a response body to a uniquely named temporary file beside `path`, then move it into place.
+        Returns the hex digest of the uncompressed body, or None without `hash_name`.
+        """
+        digest = hashlib.new(hash_name) if hash_name else None
+        # A unique name per download, so processes refreshing the same file never write into each other's copy
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=f"{os.path.basename(path)}.", suffix=".part", delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            opener = gzip.open if compress else open
+            with opener(tmp_path, "wb") as output:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    output.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return digest.hexdigest() if digest is not None else None
+
+    async def get_text(self, url, **kwargs):
+        """Return the body as text for a 200 response, otherwise None."""
+        response = await self.get(url, **kwargs)
+        return response.text() if response is not None and response.ok else None
+
+    async def get_json(self, url, **kwargs):
+        """Return the decoded JSON body for a 200 response, otherwise None."""
+        response = await self.get(url, **kwargs)
+        if response is None or not response.ok:
+            return None
+        try:
+            return response.json()
+        except ValueError as e:
+            logger.error(f"Invalid JSON from {url}: {e}")
+            return None
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._host_semaphores = {}
+
+
+_client = None
+
+
+def get_client():
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = RSHttpClient()
+    return _client
+
+
+async def close_client():
+    """Close the process-wide client; call this on bot shutdown or at the end of a script."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+async def run_and_close(coro):
+    """Await a coroutine and close the process-wide client afterwards; for asyncio.run() in scripts."""
+    try:
+        return await coro
+    finally:
+        await close_client()
@@ -0,0 +1,148 @@
+# item_index.py
+import logging
+import os
+import re
+from bisect import bisect_left
+from collections import Counter
+
+from cogs.common.rs_dump import DUMP_PATH, JAGEX_TIMESTAMP_KEY, iter_dump_records
+
+logger = logging.getLogger(__name__)
+
+# Fields kept per item; the dump also carries translations and icons we never look up
+ITEM_FIELDS = ("id", "name", "examine", "members", "limit", "value", "highalch", "lowalch", "price", "last", "volume")
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_item_name(name):
+    """Lowercase and collapse punctuation/whitespace so "Dragon 2h-sword" and "dragon 2h sword" match."""
+    return " ".join(_NON_ALNUM.sub(" ", name.lower()).split())
+
+
+def trigrams(text):
+    """Character trigrams of a normalized name, padded so short names and word starts still count."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemIndex:
+    """
+    GE items held in memory for lookups by id, exact name, name prefix or fuzzy name.
+
+    Built once from the rs_dump records. Prefix search bisects a sorted name list;
+    fuzzy search ranks candidates gathered from a trigram -> ids posting index.
+    """
+
+    def __init__(self, items, updated_at=None):
+        self.items = items
+        self.updated_at = updated_at  # Epoch seconds of the GE update the prices come from, if known
+        self.by_name = {}
+        for item_id, item in items.items():
+            self.by_name.setdefault(normalize_item_name(item["name"]), item_id)
+        self.sorted_names = sorted(self.by_name)
+        self.name_trigrams = {}
+        self.postings = {}
+        for name, item_id in self.by_name.items():
+            grams = trigrams(name)
+            self.name_trigrams[item_id] = len(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(item_id)
+
+    @classmethod
+    def from_records(cls, records, updated_at=None):
+        """Build from (item_id, record) pairs such as iter_dump_records() yields."""
+        items = {}
+        for item_id, record in records:
+            if not record.get("name"):
+                continue
+            item = {field: record.get(field) for field in ITEM_FIELDS}
+            item["id"] = item_id
+            items[item_id] = item
+        return cls(items, updated_at)
+
+    @classmethod
+    def from_file(cls, path=DUMP_PATH):
+        """Build from a dump on disk (plain or .gz), parsed incrementally."""
+        extras = {}
+        index = cls.from_records(iter_dump_records(path, extras))
+        index.updated_at = extras.get(JAGEX_TIMESTAMP_KEY)
+        return index
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    def lookup(self, name):
+        """Exact (normalized) name match, or None."""
+        item_id = self.by_name.get(normalize_item_name(name))
+        return None if item_id is None else self.items[item_id]
+
+    def prefix(self, query, limit=25):
+        """Items whose normalized name starts with the query, alphabetically."""
+        query = normalize_item_name(query)
+        results = []
+        position = bisect_left(self.sorted_names, query)
+        while position < len(self.sorted_names) and len(results) < limit:
+            name = self.sorted_names[position]
+            if not name.startswith(query):
+                break
+            results.append(self.items[self.by_name[name]])
+            position += 1
+        return results
+
+    def fuzzy(self, query, limit=25, min_coverage=0.5):
+        """
+        Items ranked by how many of the query's trigrams their name contains, then by trigram
+        Jaccard similarity so shorter, closer names win ties.
+        """
+        grams = trigrams(normalize_item_name(query))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scored = []
+        for item_id, count in shared.items():
+            coverage = count / len(grams)
+            if coverage >= min_coverage:
+                similarity = count / (len(grams) + self.name_trigrams[item_id] - count)
+                scored.append((coverage, similarity, item_id))
+        scored.sort(key=lambda entry: (-entry[0], -entry[1]))
+        return [self.items[item_id] for _, _, item_id in scored[:limit]]
+
+    def search(self, query, limit=25):
+        """Exact match first, then prefix matches, then fuzzy matches, without duplicates."""
+        if not normalize_item_name(query):
+            return []
+        results = {}
+        exact = self.lookup(query)
+        if exact is not None:
+            results[exact["id"]] = exact
+        for item in self.prefix(query, limit) + self.fuzzy(query, limit):
+            if len(results) >= limit:
+                break
+            results.setdefault(item["id"], item)
+        return list(results.values())[:limit]
+
+
+# The index the running bot answers lookups from; swapped whole on each rebuild
+_current_index = None
+
+
+def get_item_index():
+    """Return the loaded ItemIndex, or None before the first load."""
+    return _current_index
+
+
+def set_item_index(index):
+    global _current_index
+    _current_index = index
+    logger.info(f"Item index loaded with {len(index)} items.")
+
+
+def load_item_index(path=DUMP_PATH):
+    """Return the loaded index, building it from the dump on disk first if needed (None if there is no dump)."""
+    if _current_index is None and os.path.exists(path):
+        set_item_index(ItemIndex.from_file(path))
+    return _current_index
@@ -0,0 +1,127 @@
+# item_matcher.py
+import logging
+import re
+from collections import deque
+
+from cogs.common.item_index import get_item_index, normalize_item_name
+
+logger = logging.getLogger(__name__)
+
+# "I found a Dragon Rider lance." / "I found an Ascension signet IV" / "I found a pair of dragon boots"
+# Longer prefixes come first, otherwise "a " would win and leave "pair of ..." in the captured name
+FOUND_PATTERN = re.compile(r"^i found (?:a pair of |a set of |an? |some )?(.+?)\.?$", re.IGNORECASE)
+
+
+class ItemNameMatcher:
+    """
+    Finds GE item names inside free text such as RuneMetrics drop messages.
+
+    The "I found a ..." phrase is looked up in the normalized-name index; other texts are scanned once
+    with an Aho-Corasick automaton over word tokens, built from every item name, and the longest name
+    found wins. Either way the cost is independent of the number of items.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]  # Length in tokens of the longest name ending at each node
+        self.output_name = [None]
+        for name in index.by_name:
+            self._add(name.split(), name)
+        self._link()
+
+    def _add(self, tokens, name):
+        node = 0
+        for token in tokens:
+            next_node = self.goto[node].get(token)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][token] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(0)
+                self.output_name.append(None)
+            node = next_node
+        self.output[node] = len(tokens)
+        self.output_name[node] = name
+
+    def _link(self):
+        """Breadth-first failure links; each node inherits the longest output reachable through them."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                inherited = self.fail[child]
+                if self.output[inherited] > self.output[child]:
+                    self.output[child] = self.output[inherited]
+                    self.output_name[child] = self.output_name[inherited]
+
+    def scan(self, text):
+        """Return the longest item name occurring in the text as whole words (earliest on ties), or None."""
+        node = 0
+        best, best_length = None, 0
+        for token in normalize_item_name(text).split():
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            if self.output[node] > best_length:
+                best, best_length = self.output_name[node], self.output[node]
+        return best
+
+    def match(self, text):
+        """
+        Return the item record a drop message refers to, or None.
+
+        An "I found a ..." message is valued only if its whole captured name is an item, so untradeable
+        or unknown drops stay unvalued instead of taking the value of a shorter name inside the text.
+        Other texts fall back to the scan.
+        """
+        if not text:
+            return None
+        name = found_item_name(text)
+        if name is not None:
+            return self.index.lookup(name)
+        name = self.scan(text)
+        return None if name is None else self.index.items[self.index.by_name[name]]
+
+
+_matcher = None
+
+
+def get_item_matcher():
+    """Return a matcher for the loaded item index, rebuilding it when the index has been swapped."""
+    global _matcher
+    index = get_item_index()
+    if index is None:
+        return None
+    if _matcher is None or _matcher.index is not index:
+        _matcher = ItemNameMatcher(index)
+        logger.info(f"Item name matcher built with {len(_matcher.goto)} states.")
+    return _matcher
+
+
+def found_item_name(text):
+    """The item name captured from an "I found ..." drop message, or None for other texts."""
+    found = FOUND_PATTERN.match(text.strip()) if text else None
+    return found.group(1) if found else None
+
+
+if __name__ == "__main__":
+    # Quick check of the drop phrasings FOUND_PATTERN has to strip
+    for message, expected in [
+        ("I found a Dragon Rider lance.", "Dragon Rider lance"),
+        ("I found an Ascension signet IV", "Ascension signet IV"),
+        ("I found some Hydrix bolt tips.", "Hydrix bolt tips"),
+        ("I found a pair of dragon boots", "dragon boots"),
+        ("I found a set of Third-age ranger armour.", "Third-age ranger armour"),
+        ("I found Eldritch crossbow mechanism", "Eldritch crossbow mechanism"),
+        ("I killed 5 Vorago.", None),
+    ]:
+        assert found_item_name(message) == expected, (message, found_item_name(message))
+    print("FOUND_PATTERN handles every phrasing.")
@@ -0,0 +1,81 @@
+# json_stream.py
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",:}]"
+
+
+def iter_object_items(stream, read_size=READ_SIZE):
+    """
+    Yield (key, value) pairs of a top-level JSON object read from a text stream, one member at a time.
+
+    Only the member being decoded (plus one read buffer) is held in memory, so a large dump of
+    id -> record objects can be consumed without building the whole dict. Raises ValueError on
+    malformed or truncated input.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(read_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def expect(characters):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] not in characters:
+            found = buffer[pos:pos + 20] if pos < len(buffer) else "end of input"
+            raise ValueError(f"Expected one of {characters!r} in JSON stream, found {found!r}")
+        pos += 1
+        return buffer[pos - 1]
+
+    def decode_value():
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Truncated or malformed JSON stream")
+                fill()
+                continue
+            # A number cut at the buffer edge ("1." of "1.5") decodes early; only trust a value once a
+            # delimiter follows it
+            if not eof and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                fill()
+                continue
+            pos = end
+            return value
+
+    expect("{")
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == "}":
+        return
+    while True:
+        key = decode_value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a string key in JSON stream, found {key!r}")
+        expect(":")
+        yield key, decode_value()
+        if expect(",}") == "}":
+            return
@@ -0,0 +1,116 @@
+# response_cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    In-process LRU cache with per-entry expiry and request coalescing.
+
+    Concurrent misses for the same key share a single in-flight fetch instead of each going upstream.
+    Failed fetches (None or an exception) are never cached.
+    """
+
+    def __init__(self, name, maxsize=512, ttl=60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._pending = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return a fresh cached value, or None on a miss/expired entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Synchronous variant of get_or_fetch for values computed locally (e.g. rendered output)."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    async def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Return the cached value for key, or await fetch() to fill it.
+
+        :param key: Hashable cache key (e.g. (endpoint, normalized_username)).
+        :param fetch: Zero-argument callable returning an awaitable.
+        :param ttl: Optional override of the cache's default TTL in seconds.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._pending.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fill(key, fetch, ttl))
+            self._pending[key] = task
+        else:
+            self.coalesced += 1
+        # Shield so one cancelled caller does not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fill(self, key, fetch, ttl):
+        try:
+            value = await fetch()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            self._pending.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+def normalize_username(username):
+    """RuneScape treats spaces, underscores, hyphens and non-breaking spaces in names as equivalent."""
+    return " ".join(username.replace("\xa0", " ").replace("_", " ").replace("-", " ").lower().split())
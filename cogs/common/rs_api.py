@@ -0,0 +1,92 @@
+# rs_api.py
+import logging
+from urllib.parse import quote
+
+from cogs.common.http_client import get_client
+from cogs.common.response_cache import TTLCache, normalize_username
+
+logger = logging.getLogger(__name__)
+
+HISCORE_URL = "https://secure.runescape.com/m=hiscore/index_lite.ws?player={username}"
+RUNEMETRICS_PROFILE_URL = "https://apps.runescape.com/runemetrics/profile/profile?user={username}&activities={activities}"
+CLAN_MEMBERS_URL = "http://services.runescape.com/m=clan-hiscores/members_lite.ws?clanName={clan_name}"
+RS_DUMP_URL = "https://chisel.weirdgloop.org/gazproj/gazbot/rs_dump.json"
+PRICE_HISTORY_URL = "https://api.weirdgloop.org/exchange/history/rs/{span}?id={item_id}"
+
+# Response caches shared by every command; tune TTLs using cache_stats()
+HISCORE_CACHE = TTLCache("hiscore", maxsize=512, ttl=120)
+RUNEMETRICS_CACHE = TTLCache("runemetrics", maxsize=512, ttl=60)
+
+
+async def _fetch_hiscore_lite(username):
+    url = HISCORE_URL.format(username=quote(username))
+    text = await get_client().get_text(url)
+    if text is None:
+        logger.warning(f"Could not retrieve hiscores for {username}.")
+    return text
+
+
+async def fetch_hiscore_lite(username, use_cache=True):
+    """Return the raw index_lite.ws payload for a player, or None if it could not be retrieved."""
+    if not use_cache:
+        return await _fetch_hiscore_lite(username)
+    key = ("hiscore", normalize_username(username))
+    return await HISCORE_CACHE.get_or_fetch(key, lambda: _fetch_hiscore_lite(username))
+
+
+async def _fetch_runemetrics_profile(username, activities):
+    url = RUNEMETRICS_PROFILE_URL.format(username=quote(username), activities=activities)
+    data = await get_client().get_json(url)
+    if data is None:
+        logger.warning(f"Could not retrieve RuneMetrics profile for {username}.")
+    return data
+
+
+async def fetch_runemetrics_profile(username, activities=20, use_cache=True):
+    """Return the RuneMetrics profile JSON (including recent activities) for a player, or None."""
+    if not use_cache:
+        return await _fetch_runemetrics_profile(username, activities)
+    key = ("runemetrics", normalize_username(username), activities)
+    return await RUNEMETRICS_CACHE.get_or_fetch(key, lambda: _fetch_runemetrics_profile(username, activities))
+
+
+def cache_stats():
+    """Return hit/miss/coalesced counters for the hiscore and RuneMetrics caches."""
+    return [HISCORE_CACHE.stats(), RUNEMETRICS_CACHE.stats()]
+
+
+async def fetch_clan_members_lite(clan_name):
+    """Return the members_lite.ws rows for a clan as a list of dicts (header line skipped)."""
+    url = CLAN_MEMBERS_URL.format(clan_name=quote(clan_name))
+    text = await get_client().get_text(url)
+    if text is None:
+        logger.error(f"Could not retrieve clan members for {clan_name}.")
+        return []
+
+    members = []
+    for line in text.strip().split("\n")[1:]:  # Skip the header line
+        try:
+            name, rank, experience, kills = line.split(",")
+            members.append({
+                "name": name.replace("\xa0", " ").strip(),
+                "rank": rank.strip(),
+                "experience": int(experience.strip()),
+                "kills": int(kills.strip())
+            })
+        except ValueError as ve:
+            logger.error(f"Error parsing clan member line: {line}. Error: {ve}")
+    return members
+
+
+async def fetch_price_history(item_id, span="all"):
+    """
+    Return an item's GE price points from the Weird Gloop history API as a list of
+    {"price", "volume", "timestamp"} dicts (timestamp in epoch milliseconds), or None.
+
+    span is "all" (full history) or "last90d"; the API has no "since" parameter.
+    """
+    data = await get_client().get_json(PRICE_HISTORY_URL.format(span=span, item_id=item_id))
+    if data is None:
+        logger.warning(f"Could not retrieve price history for item {item_id}.")
+        return None
+    return data.get(str(item_id), [])
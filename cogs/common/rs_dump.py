@@ -0,0 +1,120 @@
+# rs_dump.py
+import gzip
+import json
+import logging
+import os
+import tempfile
+from itertools import islice
+
+from cogs.common.http_client import get_client
+from cogs.common.json_stream import iter_object_items
+from cogs.common.rs_api import RS_DUMP_URL
+
+logger = logging.getLogger(__name__)
+
+# The single on-disk copy of the GE catalog, shared by the loaders and the /price index
+DUMP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rs_data_generic", "rs_dump.json.gz")
+JAGEX_TIMESTAMP_KEY = "%JAGEX_TIMESTAMP%"  # Epoch seconds of the GE update the prices come from
+
+
+def meta_path(path):
+    return f"{path}.meta.json"
+
+
+def load_dump_meta(path=DUMP_PATH):
+    """
+    Validators and content hash of the copy on disk, plus the hash each consumer last processed:
+    {"etag", "last_modified", "sha256", "processed": {consumer: sha256}}.
+    """
+    try:
+        with open(meta_path(path)) as meta_file:
+            return json.load(meta_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_dump_meta(meta, path=DUMP_PATH):
+    target = meta_path(path)
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(target)),
+                                     prefix=f"{os.path.basename(target)}.", suffix=".tmp", delete=False) as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(meta_file.name, target)
+
+
+def update_dump_meta(path=DUMP_PATH, **fields):
+    """Merge fields into the meta file as it is now, keeping what other processes saved meanwhile."""
+    meta = load_dump_meta(path)
+    meta.update(fields)
+    save_dump_meta(meta, path)
+
+
+async def download_rs_dump(path=DUMP_PATH, url=RS_DUMP_URL):
+    """
+    Refresh the on-disk dump with a conditional GET; returns the SHA-256 of the current copy, or None.
+
+    The stored ETag/Last-Modified are sent back so an unchanged catalog costs a 304 and no body.
+    Consumers compare the returned hash with dump_processed() to skip work on content they already saw.
+    """
+    meta = load_dump_meta(path)
+    headers = {}
+    if os.path.exists(path) and meta.get("sha256"):
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = await get_client().download(url, path, headers=headers, compress=True, hash_name="sha256")
+    if response is not None and response.status == 304:
+        logger.info("GE item dump not modified since the last download.")
+        return meta["sha256"]
+    if response is None or not response.ok:
+        logger.error(f"Could not download the GE item dump from {url}.")
+        return None
+
+    if response.digest == meta.get("sha256"):
+        logger.info("GE item dump downloaded but its content is unchanged.")
+    else:
+        logger.info(f"Saved the GE item dump to {path} ({os.path.getsize(path):,} bytes compressed).")
+    # Re-read before saving: another process may have marked content processed during the download
+    update_dump_meta(path, etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"),
+                     sha256=response.digest)
+    return response.digest
+
+
+def dump_processed(consumer, path=DUMP_PATH):
+    """Hash of the dump content `consumer` last finished processing, or None."""
+    return load_dump_meta(path).get("processed", {}).get(consumer)
+
+
+def mark_dump_processed(consumer, digest, path=DUMP_PATH):
+    processed = load_dump_meta(path).get("processed", {})
+    update_dump_meta(path, processed={**processed, consumer: digest})
+
+
+def open_dump(path=DUMP_PATH):
+    """Open a dump as text, transparently decompressing .gz copies."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_dump_records(path=DUMP_PATH, extras=None):
+    """
+    Yield (item_id, record) for every item in the dump, parsed incrementally.
+
+    Non-item keys (%JAGEX_TIMESTAMP%, %UPDATE_DETECTED%) are skipped, or collected into `extras` if a dict
+    is given; they sit at the end of the dump, so read them once the iterator is exhausted.
+    """
+    with open_dump(path) as dump_file:
+        for key, record in iter_object_items(dump_file):
+            if key.isdigit() and isinstance(record, dict):
+                yield int(key), record
+            elif extras is not None:
+                extras[key] = record
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -1,18 +1,35 @@
-import pandas as pd
-from datetime import datetime
-
-# Step 1: Read the CSV
-df = pd.read_csv("formatted_skill_data_cron.csv")
+import argparse
+from datetime import datetime, timedelta
 
+import pandas as pd
+from sqlalchemy import text
+
+from cogs.common.db import get_engine
+from cogs.common.hiscores import SKILLS
+from cogs.dxp_leaderboard.skill_snapshots import BASELINE_LOOKBACK, SNAPSHOT_TABLE
+
+parser = argparse.ArgumentParser(description="Pivot skill_snapshots into one row per player per hour.")
+parser.add_argument("--days", type=int, default=7, help="How many days of snapshots to pivot")
+parser.add_argument("--output", default="transformed_skill_data.csv", help="CSV file to write")
+args = parser.parse_args()
+
+# Step 1: Read the snapshots. Only changed skills are stored after each daily keyframe, so read back
+# far enough to reach the keyframe in front of the window.
+since = datetime.now() - timedelta(days=args.days)
+query = text(f"""
+    SELECT username, skill, retrieved_at, experience, level, rank
+    FROM {SNAPSHOT_TABLE}
+    WHERE retrieved_at > :start
+""")
+with get_engine().connect() as conn:
+    df = pd.read_sql(query, conn, params={"start": since - BASELINE_LOOKBACK})
+df['skill'] = df['skill'].map(dict(enumerate(SKILLS)))
 
 print("Columns in df:", df.columns)
 print(df.head())
 
-df['time_retrieved'] = pd.to_datetime(df['time_retrieved'])
-
 # Step 2: Create a 'day-hour' column
-#df['datetime'] = pd.to_datetime(df['datetime'])
-df['day_hour'] = df['time_retrieved'].dt.floor('H')  # Rounds to the nearest hour
+df['day_hour'] = df['retrieved_at'].dt.floor('h')  # Rounds down to the hour
 
 # Step 3: Pivot the data
 pivoted_df = df.pivot_table(
@@ -22,13 +39,13 @@ pivoted_df = df.pivot_table(
     aggfunc='max'                    # Use 'max' to handle duplicates if necessary
 )
 
-
 # Step 4: Flatten the MultiIndex columns
 pivoted_df.columns = ['_'.join(col).strip() for col in pivoted_df.columns.values]
 
-# Step 5: Reset the index to get a clean DataFrame
+# Step 5: Carry unchanged skills forward from each player's previous hour, then drop the lookback rows
+pivoted_df = pivoted_df.groupby(level='username').ffill()
 pivoted_df.reset_index(inplace=True)
+pivoted_df = pivoted_df[pivoted_df['day_hour'] > since]
 
 # Step 6: Save to a new CSV
-pivoted_df.to_csv("transformed_skill_data.csv", index=False)
-
+pivoted_df.to_csv(args.output, index=False)
@@ -0,0 +1,117 @@
+# ~/discordbot10s/cogs/dxp_leaderboard/dxp_leaderboard.py
+
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+
+import discord
+from discord import app_commands, Embed
+from discord.ext import commands, tasks
+
+from cogs.common.db import get_engine
+from cogs.common.hiscores import SKILLS
+from cogs.dxp_leaderboard.leaderboard_state import LeaderboardState
+
+logger = logging.getLogger(__name__)
+
+START_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+
+def parse_start(value):
+    """Parse an event start time typed by a user; returns None if no format matches."""
+    for fmt in START_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class DxpLeaderboardCog(commands.Cog):
+    """/dxp_leaderboard answered from in-memory snapshot state that is refreshed incrementally."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = self.load_config()
+        self.state = LeaderboardState(get_engine())
+        self.event_start = parse_start(self.config.get('event_start', ''))
+        self.top = self.config.get('top', 25)
+
+    def load_config(self):
+        """Load configuration from dxp_leaderboard_config.json."""
+        config_path = os.path.join(os.path.dirname(__file__), 'config', 'dxp_leaderboard_config.json')
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"Configuration file not found: {config_path}")
+        with open(config_path) as config_file:
+            return json.load(config_file)
+
+    async def cog_load(self):
+        self.refresh_state.change_interval(minutes=self.config.get('refresh_interval_minutes', 5))
+        self.refresh_state.start()
+
+    @tasks.loop(minutes=5)
+    async def refresh_state(self):
+        """Fold newly stored snapshots into the in-memory state."""
+        try:
+            await asyncio.to_thread(self.state.refresh)
+            if self.event_start is not None:
+                await asyncio.to_thread(self.state.load_baseline, self.event_start)
+        except Exception as e:
+            logger.error(f"Failed to refresh leaderboard state: {e}")
+
+    def render(self, start, skill, entries):
+        embed = Embed(title=f"DXP leaderboard - {skill}", color=discord.Color.gold())
+        if not entries:
+            embed.description = f"No {skill} XP gained since {start:%Y-%m-%d %H:%M} yet."
+        else:
+            width = max(len(name) for name, _, _ in entries)
+            lines = [f"{position:>2}. {name:<{width}} {gained:>13,}"
+                     for position, (name, gained, _) in enumerate(entries, start=1)]
+            embed.description = "```\n" + "\n".join(lines) + "\n```"
+        updated = f"{self.state.updated_at:%Y-%m-%d %H:%M}" if self.state.updated_at is not None else "never"
+        embed.set_footer(text=f"Since {start:%Y-%m-%d %H:%M} | snapshots up to {updated}")
+        return embed
+
+    @app_commands.command(name="dxp_leaderboard", description="XP gained by clan members since an event start")
+    @app_commands.describe(
+        start="Event start, e.g. 2024-11-15 12:00 (defaults to the configured event)",
+        skill="Skill to rank by (default Overall)"
+    )
+    async def dxp_leaderboard(self, interaction: discord.Interaction, start: str = None, skill: str = "Overall"):
+        start_time = parse_start(start) if start else self.event_start
+        if start_time is None:
+            await interaction.response.send_message(
+                "Please give the event start as `YYYY-MM-DD HH:MM`.", ephemeral=True)
+            return
+        if skill not in SKILLS:
+            await interaction.response.send_message(f"Unknown skill: {skill}", ephemeral=True)
+            return
+
+        if self.state.updated_at is not None:
+            entries = self.state.leaderboard(start_time, skill, self.top)
+            if entries is not None:
+                await interaction.response.send_message(embed=self.render(start_time, skill, entries))
+                return
+
+        # First request for this start time (or before the first refresh): resolve the baseline once
+        await interaction.response.defer()
+        if self.state.updated_at is None:
+            await asyncio.to_thread(self.state.refresh)
+        baseline = await asyncio.to_thread(self.state.load_baseline, start_time)
+        entries = self.state.leaderboard(start_time, skill, self.top, baseline=baseline)
+        await interaction.followup.send(embed=self.render(start_time, skill, entries))
+
+    @dxp_leaderboard.autocomplete("skill")
+    async def skill_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=skill, value=skill)
+                for skill in SKILLS if current.lower() in skill.lower()][:25]
+
+    def cog_unload(self):
+        """Handle cleanup when the cog is unloaded."""
+        self.refresh_state.cancel()
+
+
+async def setup(bot):
+    await bot.add_cog(DxpLeaderboardCog(bot))
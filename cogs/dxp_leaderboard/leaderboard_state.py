@@ -0,0 +1,132 @@
+# leaderboard_state.py
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from cogs.common.hiscores import SKILLS
+from cogs.dxp_leaderboard.skill_snapshots import (BASELINE_LOOKBACK, MISSING, SKILL_INDEX, first_snapshots_after,
+                                                  snapshots_as_of, snapshots_since)
+
+logger = logging.getLogger(__name__)
+
+MAX_BASELINES = 4  # Event start times kept in memory at once
+# Snapshot rows are committed some time after their retrieved_at (fetches run concurrently and are written
+# in batches), so each refresh re-reads this far behind the previous one and de-duplicates
+REFRESH_OVERLAP = timedelta(minutes=30)
+
+
+class LeaderboardState:
+    """
+    Latest XP per member and skill, plus baselines for recently requested event start times.
+
+    Both live in int64 arrays (members x skills) held in memory. refresh() only reads the rows
+    stored since the last call, so a leaderboard is a vectorized subtraction rather than a scan.
+    """
+
+    def __init__(self, engine, max_baselines=MAX_BASELINES):
+        self.engine = engine
+        self.max_baselines = max_baselines
+        self.names = []
+        self.index = {}
+        self.latest = np.full((0, len(SKILLS)), MISSING, dtype=np.int64)
+        self.updated_at = None  # Newest retrieved_at applied so far
+        self.read_at = None  # When the previous refresh queried the table
+        self.baselines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _rows_for(self, usernames):
+        """Map usernames to array rows, growing the arrays for members seen for the first time."""
+        new_names = [name for name in dict.fromkeys(usernames) if name not in self.index]
+        if new_names:
+            for name in new_names:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+            padding = np.full((len(new_names), len(SKILLS)), MISSING, dtype=np.int64)
+            self.latest = np.vstack([self.latest, padding])
+            for start, baseline in self.baselines.items():
+                self.baselines[start] = np.vstack([baseline, padding])
+        return np.fromiter((self.index[name] for name in usernames), dtype=np.intp, count=len(usernames))
+
+    def _apply_latest(self, df):
+        df = df.drop_duplicates(["username", "skill"], keep="last")
+        rows = self._rows_for(df["username"].tolist())
+        self.latest[rows, df["skill"].to_numpy()] = df["experience"].to_numpy()
+
+    def _fill_baselines(self, df):
+        """Members without a value at an event's start take their first snapshot after it."""
+        for start, baseline in self.baselines.items():
+            after = df[df["retrieved_at"] > start].drop_duplicates(["username", "skill"], keep="first")
+            if after.empty:
+                continue
+            rows = self._rows_for(after["username"].tolist())
+            skills = after["skill"].to_numpy()
+            missing = baseline[rows, skills] == MISSING
+            baseline[rows[missing], skills[missing]] = after["experience"].to_numpy()[missing]
+
+    def refresh(self):
+        """Pull snapshot rows stored since the last refresh (the full as-of state on first use)."""
+        now = datetime.now()
+        if self.read_at is None:
+            df = snapshots_as_of(self.engine, now)
+        else:
+            # Rows are read oldest first, so re-read ones collapse onto the newest value per member and skill
+            df = snapshots_since(self.engine, self.read_at - REFRESH_OVERLAP)
+        with self._lock:
+            if not df.empty:
+                self._apply_latest(df)
+                self._fill_baselines(df)
+                newest = df["retrieved_at"].max()
+                self.updated_at = newest if self.updated_at is None else max(self.updated_at, newest)
+            elif self.updated_at is None:
+                self.updated_at = now - BASELINE_LOOKBACK
+            self.read_at = now
+        logger.info(f"Leaderboard state refreshed with {len(df)} rows; {len(self.names)} members tracked.")
+
+    def load_baseline(self, start):
+        """
+        Resolve every member's XP at `start` (or first snapshot after it), keep it in memory and return it.
+
+        The array is returned because concurrent requests for other start times may evict it again.
+        """
+        with self._lock:
+            baseline = self.baselines.get(start)
+        if baseline is not None:
+            return baseline
+        as_of = snapshots_as_of(self.engine, start)
+        after = first_snapshots_after(self.engine, start, self.updated_at or datetime.now())
+        with self._lock:
+            baseline = np.full_like(self.latest, MISSING)
+            for df in (after, as_of):  # as-of values take precedence over first-after ones
+                if not df.empty:
+                    rows = self._rows_for(df["username"].tolist())
+                    if len(baseline) < len(self.names):
+                        baseline = np.vstack([baseline, np.full((len(self.names) - len(baseline), len(SKILLS)),
+                                                                MISSING, dtype=np.int64)])
+                    baseline[rows, df["skill"].to_numpy()] = df["experience"].to_numpy()
+            self.baselines[start] = baseline
+            while len(self.baselines) > self.max_baselines:
+                self.baselines.popitem(last=False)
+            return baseline
+
+    def leaderboard(self, start, skill="Overall", top=25, baseline=None):
+        """
+        Return [(username, xp_gained, latest_xp)] for the top gainers since `start`, or None if its
+        baseline is not in memory and was not passed in (call load_baseline first).
+        """
+        with self._lock:
+            if start in self.baselines:
+                self.baselines.move_to_end(start)
+                baseline = self.baselines[start]
+            elif baseline is None:
+                return None
+            column = SKILL_INDEX[skill]
+            latest = self.latest[:, column]
+            # An evicted baseline stops growing with new members; they have no value at the start
+            baseline = np.concatenate([baseline[:, column],
+                                       np.full(len(latest) - len(baseline), MISSING, dtype=np.int64)])
+            gained = np.where((baseline != MISSING) & (latest != MISSING), latest - baseline, 0)
+            order = np.argsort(-gained, kind="stable")[:top]
+            return [(self.names[i], int(gained[i]), int(latest[i])) for i in order if gained[i] > 0]
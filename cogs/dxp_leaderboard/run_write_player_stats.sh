@@ -3,8 +3,8 @@
 source ~/miniconda3/etc/profile.d/conda.sh
 conda activate discordbeta
 
-# Change to the directory where the script is located
-cd /home/discordbeta/discordbot10s/cogs/dxp_leaderboard
+# Run from the repository root so the shared cogs.common modules are importable
+cd /home/discordbeta/discordbot10s
 
 # Run the Python script
-python write_player_stats_to_csv.py
+python -m cogs.dxp_leaderboard.write_player_stats_to_csv
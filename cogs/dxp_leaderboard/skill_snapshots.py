@@ -0,0 +1,256 @@
+# skill_snapshots.py
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (BigInteger, Column, DateTime, Integer, MetaData, PrimaryKeyConstraint, SmallInteger, String,
+                        Table, text)
+
+from cogs.common.bulk_upsert import bulk_upsert
+from cogs.common.db import get_engine
+from cogs.common.hiscores import MISSING, SKILL_INDEX, SKILLS, apply_virtual_levels
+
+logger = logging.getLogger(__name__)
+
+# Constants
+SNAPSHOT_TABLE = "skill_snapshots"
+# How far back to look for a player's value "as of" a time. Every player gets a full keyframe once a day,
+# so two days always reach the previous keyframe even just before today's is written.
+BASELINE_LOOKBACK = timedelta(days=2)
+
+metadata = MetaData()
+
+# One row per (player, skill, snapshot), range-partitioned by day on retrieved_at.
+# The primary key doubles as the (username, skill, time) index used by every lookup below.
+skill_snapshots = Table(
+    SNAPSHOT_TABLE, metadata,
+    Column('username', String, nullable=False),
+    Column('skill', SmallInteger, nullable=False),  # Index into SKILLS
+    Column('retrieved_at', DateTime, nullable=False),
+    Column('experience', BigInteger, nullable=False),
+    Column('level', SmallInteger, nullable=True),
+    Column('rank', Integer, nullable=True),
+    PrimaryKeyConstraint('username', 'skill', 'retrieved_at'),
+    postgresql_partition_by='RANGE (retrieved_at)',
+)
+
+
+def create_snapshot_table(engine):
+    """Create the partitioned parent table if it does not exist yet."""
+    metadata.create_all(engine, tables=[skill_snapshots])
+
+
+def partition_name(day):
+    return f"{SNAPSHOT_TABLE}_{day:%Y%m%d}"
+
+
+def ensure_partitions(engine, days):
+    """Create the daily partitions covering the given dates (no-op for ones that already exist)."""
+    with engine.begin() as conn:
+        for day in sorted(set(days)):
+            start = datetime(day.year, day.month, day.day)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {SNAPSHOT_TABLE} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{start + timedelta(days=1):%Y-%m-%d}')"
+            ))
+
+
+class SnapshotBatch:
+    """Fetched profiles in compact integer form: one row per player, one column per skill index."""
+    __slots__ = ("usernames", "retrieved_at", "experience", "level", "rank")
+
+    def __init__(self, usernames, retrieved_at, experience, level, rank):
+        self.usernames = usernames
+        self.retrieved_at = retrieved_at  # int64 epoch seconds, per player
+        self.experience = experience  # int64, players x skills, MISSING where unknown
+        self.level = level  # int16
+        self.rank = rank  # int32
+
+    def __len__(self):
+        return len(self.usernames)
+
+
+def encode_snapshots(player_stats):
+    """Stack PlayerStats records into a SnapshotBatch, deriving virtual/elite levels for the whole batch."""
+    if not player_stats:
+        empty = np.empty((0, len(SKILLS)), dtype=np.int64)
+        return SnapshotBatch([], np.empty(0, dtype=np.int64), empty, empty.astype(np.int16), empty.astype(np.int32))
+    experience = np.stack([stats.experience for stats in player_stats])
+    level = apply_virtual_levels(np.stack([stats.hiscore_level for stats in player_stats]), experience)
+    rank = np.stack([stats.rank for stats in player_stats])
+    retrieved_at = np.array([stats.retrieved_at for stats in player_stats], dtype=np.int64)
+    return SnapshotBatch([stats.username for stats in player_stats], retrieved_at, experience,
+                         level.astype(np.int16), rank.astype(np.int32))
+
+
+def delta_rows(batch, stored):
+    """
+    Rows for the skills whose experience changed since the last stored snapshot.
+
+    A player's first snapshot of each day is written in full (a keyframe), so an as-of lookup never
+    needs to look further back than BASELINE_LOOKBACK.
+
+    :param stored: snapshots_as_of() result holding the last stored row per player and skill.
+    """
+    index = {name: row for row, name in enumerate(batch.usernames)}
+    previous = np.full(batch.experience.shape, MISSING, dtype=np.int64)
+    stored = stored[stored["username"].isin(index)]
+    newest_day = {}
+    if not stored.empty:
+        rows = stored["username"].map(index).to_numpy()
+        previous[rows, stored["skill"].to_numpy()] = stored["experience"].to_numpy()
+        newest_day = stored.groupby("username")["retrieved_at"].max().dt.date.to_dict()
+
+    fetched_day = [datetime.fromtimestamp(int(epoch)).date() for epoch in batch.retrieved_at]
+    keyframe = np.array([newest_day.get(name) != day for name, day in zip(batch.usernames, fetched_day)], dtype=bool)
+    known = batch.experience != MISSING
+    changed = known & ((batch.experience != previous) | keyframe[:, None])
+
+    players, skills = np.nonzero(changed)
+    times = {row: datetime.fromtimestamp(int(batch.retrieved_at[row])) for row in set(players.tolist())}
+    return [
+        {
+            "username": batch.usernames[player],
+            "skill": int(skill),
+            "retrieved_at": times[player],
+            "experience": int(batch.experience[player, skill]),
+            "level": int(batch.level[player, skill]) if batch.level[player, skill] != MISSING else None,
+            "rank": int(batch.rank[player, skill]) if batch.rank[player, skill] != MISSING else None,
+        }
+        for player, skill in zip(players.tolist(), skills.tolist())
+    ]
+
+
+def write_snapshots(engine, rows):
+    """Store snapshot rows, creating any missing day partitions first. Re-sent rows are skipped."""
+    if not rows:
+        return None
+    ensure_partitions(engine, [row["retrieved_at"].date() for row in rows])
+    return bulk_upsert(engine, SNAPSHOT_TABLE, rows, conflict_columns=['username', 'skill', 'retrieved_at'],
+                       update_columns=[], table=skill_snapshots)
+
+
+def experience_as_of(engine, when, skill="Overall", lookback=BASELINE_LOOKBACK):
+    """Return {username: experience} for each player's last snapshot at or before `when`."""
+    query = text(f"""
+        SELECT DISTINCT ON (username) username, experience
+        FROM {SNAPSHOT_TABLE}
+        WHERE skill = :skill AND retrieved_at > :start AND retrieved_at <= :end
+        ORDER BY username, retrieved_at DESC
+    """)
+    with engine.connect() as conn:
+        result = conn.execute(query, {"skill": SKILL_INDEX[skill], "start": when - lookback, "end": when})
+        return {row.username: row.experience for row in result}
+
+
+def _first_after(engine, since, until, skill, usernames):
+    """Earliest snapshot after `since` for players that have none before it (e.g. joined mid-event)."""
+    query = text(f"""
+        SELECT DISTINCT ON (username) username, experience
+        FROM {SNAPSHOT_TABLE}
+        WHERE skill = :skill AND username = ANY(:usernames) AND retrieved_at > :start AND retrieved_at <= :end
+        ORDER BY username, retrieved_at
+    """)
+    with engine.connect() as conn:
+        result = conn.execute(query, {"skill": SKILL_INDEX[skill], "usernames": list(usernames),
+                                      "start": since, "end": until})
+        return {row.username: row.experience for row in result}
+
+
+def snapshots_as_of(engine, when, lookback=BASELINE_LOOKBACK):
+    """Return every player's last row per skill at or before `when` as a DataFrame."""
+    query = text(f"""
+        SELECT DISTINCT ON (username, skill) username, skill, experience, retrieved_at
+        FROM {SNAPSHOT_TABLE}
+        WHERE retrieved_at > :start AND retrieved_at <= :end
+        ORDER BY username, skill, retrieved_at DESC
+    """)
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn, params={"start": when - lookback, "end": when})
+
+
+def first_snapshots_after(engine, since, until):
+    """Return every player's first row per skill in (since, until] as a DataFrame."""
+    query = text(f"""
+        SELECT DISTINCT ON (username, skill) username, skill, experience, retrieved_at
+        FROM {SNAPSHOT_TABLE}
+        WHERE retrieved_at > :start AND retrieved_at <= :end
+        ORDER BY username, skill, retrieved_at
+    """)
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn, params={"start": since, "end": until})
+
+
+def snapshots_since(engine, after):
+    """Return every row stored after `after`, oldest first; only the newest partitions are scanned."""
+    query = text(f"""
+        SELECT username, skill, experience, retrieved_at
+        FROM {SNAPSHOT_TABLE}
+        WHERE retrieved_at > :after
+        ORDER BY retrieved_at
+    """)
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn, params={"after": after})
+
+
+def write_snapshot_deltas(engine, batch):
+    """Persist only the skills whose experience changed since each player's last stored snapshot."""
+    stored = snapshots_as_of(engine, datetime.now())
+    rows = delta_rows(batch, stored)
+    total = len(batch) * len(SKILLS)
+    logger.info(f"Writing {len(rows)} of {total} skill snapshots ({len(batch)} players); the rest are unchanged.")
+    return write_snapshots(engine, rows)
+
+
+def xp_gained_since(engine, since, skill="Overall", until=None):
+    """
+    Experience gained per player between `since` and `until` (default: now), largest first.
+
+    Only the day partitions around both ends are touched, through the (username, skill, time) index.
+    """
+    until = until or datetime.now()
+    latest = experience_as_of(engine, until, skill)
+    baseline = experience_as_of(engine, since, skill)
+    missing = set(latest) - set(baseline)
+    if missing:
+        baseline.update(_first_after(engine, since, until, skill, missing))
+
+    df = pd.DataFrame(
+        [(name, baseline[name], experience) for name, experience in latest.items() if name in baseline],
+        columns=["username", "start_experience", "latest_experience"],
+    )
+    df["experience_diff"] = df["latest_experience"] - df["start_experience"]
+    return df.sort_values("experience_diff", ascending=False, ignore_index=True)
+
+
+def import_csv(engine, path, chunksize=50000):
+    """One-off import of the legacy formatted_skill_data_cron.csv into skill_snapshots."""
+    total = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = chunk[chunk["skill"].isin(SKILL_INDEX)]
+        chunk = chunk.assign(
+            skill=chunk["skill"].map(SKILL_INDEX),
+            retrieved_at=pd.to_datetime(chunk["time_retrieved"]),
+            experience=pd.to_numeric(chunk["experience"], errors="coerce"),
+            level=pd.to_numeric(chunk["level"], errors="coerce").astype("Int64"),
+            rank=pd.to_numeric(chunk["rank"], errors="coerce").astype("Int64"),
+        ).dropna(subset=["experience", "retrieved_at"]).astype({"experience": "int64"})
+        ensure_partitions(engine, chunk["retrieved_at"].dt.date.unique())
+        bulk_upsert(engine, SNAPSHOT_TABLE, chunk, conflict_columns=['username', 'skill', 'retrieved_at'],
+                    update_columns=[], table=skill_snapshots)
+        total += len(chunk)
+    logger.info(f"Imported {total} snapshot rows from {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Create the skill_snapshots table and import legacy CSV data.")
+    parser.add_argument('--import-csv', type=str, help='Path to a formatted_skill_data_cron.csv to import.')
+    args = parser.parse_args()
+
+    engine = get_engine()
+    create_snapshot_table(engine)
+    if args.import_csv:
+        import_csv(engine, args.import_csv)
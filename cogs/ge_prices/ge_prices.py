@@ -0,0 +1,233 @@
+# ~/discordbot10s/cogs/ge_prices/ge_prices.py
+
+import os
+import json
+import asyncio
+import logging
+
+import discord
+from discord import app_commands, Embed
+from discord.ext import commands, tasks
+
+from cogs.common.db import get_engine
+from cogs.common.item_index import ItemIndex, get_item_index, set_item_index
+from cogs.common.rs_dump import DUMP_PATH, download_rs_dump, load_dump_meta
+from cogs.ge_prices.price_history import DEFAULT_BATCH_SIZE, collect_history, price_changes
+from cogs.ge_prices.price_snapshots import DEFAULT_WINDOW_DAYS, load_price_matrix, write_price_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+PERIOD_LABELS = {"week": "WoW", "month": "MoM", "year": "YoY"}
+MOVER_KINDS = {
+    "gainers": "Top gainers",
+    "losers": "Top losers",
+    "volatile": "Most volatile",
+    "volume": "Volume spikes",
+}
+
+
+def format_gp(value):
+    return "-" if value is None else f"{int(value):,} gp"
+
+
+def format_changes(changes):
+    """One line per period, e.g. "WoW  +3.2% (105,443 gp)"."""
+    lines = []
+    for period, label in PERIOD_LABELS.items():
+        entry = changes.get(period)
+        if entry is None or entry["change"] is None:
+            continue
+        lines.append(f"{label}  {entry['change']:+.1%} (from {format_gp(entry['previous_close'])})")
+    return "\n".join(lines)
+
+
+class GePricesCog(commands.Cog):
+    """/price lookups served from an in-memory index of the GE item dump, plus the price history collector."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = self.load_config()
+        self.engine = get_engine()
+        self.dump_path = DUMP_PATH  # The one copy shared with insert_items.py and the history CLI
+        self.index_digest = None  # Content hash of the dump the current index was built from
+        self.price_matrix = None  # Recent daily snapshots for /movers, reloaded after each new snapshot
+
+    def load_config(self):
+        """Load configuration from ge_prices_config.json."""
+        config_path = os.path.join(os.path.dirname(__file__), 'config', 'ge_prices_config.json')
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"Configuration file not found: {config_path}")
+        with open(config_path) as config_file:
+            return json.load(config_file)
+
+    async def cog_load(self):
+        # Start from the dump on disk so lookups work before the first download finishes
+        if os.path.exists(self.dump_path):
+            try:
+                set_item_index(await asyncio.to_thread(ItemIndex.from_file, self.dump_path))
+                self.index_digest = load_dump_meta(self.dump_path).get("sha256")
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load item dump from {self.dump_path}: {e}")
+        self.refresh_index.change_interval(minutes=self.config.get('refresh_interval_minutes', 60))
+        self.refresh_index.start()
+        self.poll_price_history.change_interval(minutes=self.config.get('history_interval_minutes', 30))
+        self.poll_price_history.start()
+
+    @tasks.loop(minutes=60)
+    async def refresh_index(self):
+        """Download the latest dump (conditionally) and swap in a freshly built index if it changed."""
+        digest = await download_rs_dump(self.dump_path)
+        if digest is None:
+            logger.warning("Could not download the GE item dump; keeping the current index.")
+            return
+        if digest == self.index_digest and get_item_index() is not None:
+            return
+        try:
+            index = await asyncio.to_thread(ItemIndex.from_file, self.dump_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to rebuild the item index from {self.dump_path}: {e}")
+            return
+        set_item_index(index)
+        self.index_digest = digest
+        # Every new dump becomes that day's price snapshot
+        try:
+            await asyncio.to_thread(write_price_snapshot, self.engine, index)
+            self.price_matrix = None
+        except Exception as e:
+            logger.error(f"Failed to store the GE price snapshot: {e}")
+
+    @tasks.loop(minutes=30)
+    async def poll_price_history(self):
+        """Poll the next batch of items for price points newer than the ones stored."""
+        index = get_item_index()
+        if index is None:
+            return
+        try:
+            await collect_history(self.engine, list(index.items),
+                                  self.config.get('history_batch_size', DEFAULT_BATCH_SIZE))
+        except Exception as e:
+            logger.error(f"Price history collection failed: {e}")
+
+    @poll_price_history.before_loop
+    async def before_poll_price_history(self):
+        await self.bot.wait_until_ready()
+
+    def render(self, item, changes=None):
+        embed = Embed(title=item["name"], color=discord.Color.gold())
+        if item.get("examine"):
+            embed.description = item["examine"]
+        price, last = item.get("price"), item.get("last")
+        embed.add_field(name="Price", value=format_gp(price), inline=True)
+        if price is not None and last:
+            change = price - last
+            embed.add_field(name="Change", value=f"{change:+,} gp ({change / last:+.1%})", inline=True)
+        embed.add_field(name="Volume", value="-" if item.get("volume") is None else f"{item['volume']:,}", inline=True)
+        embed.add_field(name="Buy limit", value="-" if item.get("limit") is None else f"{item['limit']:,}", inline=True)
+        embed.add_field(name="High alch", value=format_gp(item.get("highalch")), inline=True)
+        embed.add_field(name="Members", value="Yes" if item.get("members") else "No", inline=True)
+        history = format_changes(changes or {})
+        if history:
+            embed.add_field(name="Price trend", value=f"```\n{history}\n```", inline=False)
+        embed.set_footer(text=f"Item ID {item['id']}")
+        return embed
+
+    @app_commands.command(name="price", description="Look up an item's Grand Exchange price")
+    @app_commands.describe(item="Item name (suggestions appear as you type)")
+    async def price(self, interaction: discord.Interaction, item: str):
+        index = get_item_index()
+        if index is None:
+            await interaction.response.send_message("The item list is still loading, try again shortly.",
+                                                    ephemeral=True)
+            return
+        # Autocomplete submits the item id; typed names fall back to the best search match
+        match = index.get(int(item)) if item.isdigit() else None
+        if match is None:
+            results = index.search(item, limit=1)
+            match = results[0] if results else None
+        if match is None:
+            await interaction.response.send_message(f"No item found matching {item}.", ephemeral=True)
+            return
+        # Trends come from the precomputed rollups: one indexed read, skipped if the database is unavailable
+        try:
+            changes = await asyncio.to_thread(price_changes, self.engine, match["id"])
+        except Exception as e:
+            logger.warning(f"Could not read price history for item {match['id']}: {e}")
+            changes = None
+        await interaction.response.send_message(embed=self.render(match, changes))
+
+    def render_movers(self, kind, days, entries):
+        index = get_item_index()
+        embed = Embed(title=MOVER_KINDS[kind], color=discord.Color.gold())
+        if not entries:
+            if self.price_matrix is not None and len(self.price_matrix.days) >= 2:
+                embed.description = "No items matched over this window."
+            else:
+                embed.description = "Not enough price snapshots yet."
+            return embed
+        names = [index.get(item_id)["name"] if index and index.get(item_id) else str(item_id)
+                 for item_id, *_ in entries]
+        width = min(max(len(name) for name in names), 28)
+        lines = []
+        for name, (item_id, score, *values) in zip(names, entries):
+            if kind in ("gainers", "losers"):
+                detail = f"{score:+8.1%}  {values[0]:,} -> {values[1]:,}"
+            elif kind == "volatile":
+                detail = f"{score:8.1%}  {values[0]:,} gp"
+            else:
+                detail = f"{score:7.1f}x  {values[0]:,} traded"
+            lines.append(f"{name[:width]:<{width}} {detail}")
+        embed.description = "```\n" + "\n".join(lines) + "\n```"
+        if kind in ("gainers", "losers"):
+            # The comparison snapshot is picked by date, so report the span actually covered
+            matrix = self.price_matrix
+            span = (matrix.days[-1] - matrix.days[matrix.compare_column(days)]).days
+            window = f"over {span} day{'s' if span != 1 else ''}"
+        else:
+            window = f"over the last {len(self.price_matrix.days)} snapshots"
+        embed.set_footer(text=f"{window} | up to {self.price_matrix.days[-1]:%Y-%m-%d}")
+        return embed
+
+    @app_commands.command(name="movers", description="Biggest GE price and volume moves across all items")
+    @app_commands.describe(kind="What to rank by", days="Days to compare for gainers/losers (default 1)")
+    @app_commands.choices(kind=[app_commands.Choice(name=label, value=kind) for kind, label in MOVER_KINDS.items()])
+    async def movers(self, interaction: discord.Interaction, kind: str = "gainers", days: int = 1):
+        await interaction.response.defer()
+        if self.price_matrix is None:
+            try:
+                self.price_matrix = await asyncio.to_thread(
+                    load_price_matrix, self.engine, self.config.get('movers_window_days', DEFAULT_WINDOW_DAYS))
+            except Exception as e:
+                logger.error(f"Failed to load GE price snapshots: {e}")
+                await interaction.followup.send("Price snapshots are unavailable right now.", ephemeral=True)
+                return
+
+        # All items are ranked in one vectorized pass over the in-memory snapshot arrays
+        options = {"top": self.config.get('movers_top', 10),
+                   "min_price": self.config.get('movers_min_price', 0),
+                   "min_volume": self.config.get('movers_min_volume', 0)}
+        days = max(days, 1)
+        if kind in ("gainers", "losers"):
+            entries = self.price_matrix.movers(days=days, gainers=kind == "gainers", **options)
+        elif kind == "volatile":
+            entries = self.price_matrix.volatility(**options)
+        else:
+            entries = self.price_matrix.volume_spikes(**options)
+        await interaction.followup.send(embed=self.render_movers(kind, days, entries))
+
+    @price.autocomplete("item")
+    async def item_autocomplete(self, interaction: discord.Interaction, current: str):
+        index = get_item_index()
+        if index is None or not current.strip():
+            return []
+        return [app_commands.Choice(name=match["name"][:100], value=str(match["id"]))
+                for match in index.search(current, limit=25)]
+
+    def cog_unload(self):
+        """Handle cleanup when the cog is unloaded."""
+        self.refresh_index.cancel()
+        self.poll_price_history.cancel()
+
+
+async def setup(bot):
+    await bot.add_cog(GePricesCog(bot))
@@ -0,0 +1,241 @@
+# price_history.py
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import (BigInteger, Column, DateTime, Integer, MetaData, PrimaryKeyConstraint, String, Table,
+                        bindparam, text)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from cogs.common.adaptive_limiter import AdaptiveLimiter
+from cogs.common.db import get_engine
+from cogs.common.http_client import run_and_close
+from cogs.common.item_index import ItemIndex
+from cogs.common.rs_api import fetch_price_history
+from cogs.common.rs_dump import DUMP_PATH
+
+logger = logging.getLogger(__name__)
+
+# Constants
+HISTORY_TABLE = "price_history"
+MARKS_TABLE = "price_history_marks"
+AGGREGATES_TABLE = "price_aggregates"
+PERIODS = ("week", "month", "year")
+RECENT_SPAN = timedelta(days=85)  # Items stored within this window only need the last90d endpoint
+DEFAULT_BATCH_SIZE = 200  # Items fetched per collection cycle
+POINTS_BATCH_SIZE = 5000  # Points per INSERT statement, well under Postgres' bind parameter limit
+
+metadata = MetaData()
+
+# One row per item per daily GE price point
+price_history = Table(
+    HISTORY_TABLE, metadata,
+    Column('item_id', Integer, nullable=False),
+    Column('timestamp', DateTime, nullable=False),
+    Column('price', BigInteger, nullable=False),
+    Column('volume', BigInteger, nullable=True),
+    PrimaryKeyConstraint('item_id', 'timestamp'),
+)
+
+# Per-item high-water mark: newest stored point and when the item was last polled
+price_history_marks = Table(
+    MARKS_TABLE, metadata,
+    Column('item_id', Integer, primary_key=True),
+    Column('last_timestamp', DateTime, nullable=True),
+    Column('last_checked', DateTime, nullable=False),
+)
+
+# Weekly/monthly/yearly rollups, rewritten only for the periods new points fall into
+price_aggregates = Table(
+    AGGREGATES_TABLE, metadata,
+    Column('item_id', Integer, nullable=False),
+    Column('period', String(5), nullable=False),  # One of PERIODS
+    Column('period_start', DateTime, nullable=False),
+    Column('open_price', BigInteger, nullable=False),
+    Column('close_price', BigInteger, nullable=False),
+    Column('min_price', BigInteger, nullable=False),
+    Column('max_price', BigInteger, nullable=False),
+    Column('avg_price', BigInteger, nullable=False),
+    Column('volume', BigInteger, nullable=True),
+    Column('points', Integer, nullable=False),
+    PrimaryKeyConstraint('item_id', 'period', 'period_start'),
+)
+
+REFRESH_AGGREGATES = text(f"""
+    INSERT INTO {AGGREGATES_TABLE}
+        (item_id, period, period_start, open_price, close_price, min_price, max_price, avg_price, volume, points)
+    SELECT h.item_id, :period, date_trunc(:period, h.timestamp) AS period_start,
+           (array_agg(h.price ORDER BY h.timestamp))[1],
+           (array_agg(h.price ORDER BY h.timestamp DESC))[1],
+           min(h.price), max(h.price), round(avg(h.price))::bigint, sum(h.volume), count(*)
+    FROM {HISTORY_TABLE} h
+    JOIN unnest(:item_ids, :since) AS changed(item_id, since)
+      ON h.item_id = changed.item_id AND h.timestamp >= date_trunc(:period, changed.since)
+    GROUP BY h.item_id, period_start
+    ON CONFLICT (item_id, period, period_start) DO UPDATE SET
+        open_price = EXCLUDED.open_price, close_price = EXCLUDED.close_price,
+        min_price = EXCLUDED.min_price, max_price = EXCLUDED.max_price, avg_price = EXCLUDED.avg_price,
+        volume = EXCLUDED.volume, points = EXCLUDED.points
+""").bindparams(bindparam("item_ids", type_=ARRAY(Integer)), bindparam("since", type_=ARRAY(DateTime)))
+
+# The two newest rollups per period, each an index range read on the primary key
+PRICE_CHANGES = text(f"""
+    SELECT p.period, a.period_start, a.close_price, a.volume
+    FROM (VALUES ('week'), ('month'), ('year')) AS p(period)
+    CROSS JOIN LATERAL (
+        SELECT period_start, close_price, volume
+        FROM {AGGREGATES_TABLE}
+        WHERE item_id = :item_id AND period = p.period
+        ORDER BY period_start DESC
+        LIMIT 2
+    ) a
+    ORDER BY p.period, a.period_start DESC
+""")
+
+
+def create_price_tables(engine):
+    metadata.create_all(engine, tables=[price_history, price_history_marks, price_aggregates])
+
+
+def load_marks(engine):
+    """Return {item_id: (last_timestamp, last_checked)} for every item polled before."""
+    with engine.connect() as conn:
+        result = conn.execute(text(f"SELECT item_id, last_timestamp, last_checked FROM {MARKS_TABLE}"))
+        return {row.item_id: (row.last_timestamp, row.last_checked) for row in result}
+
+
+def items_due(item_ids, marks, batch_size=DEFAULT_BATCH_SIZE):
+    """Never-polled items first, then the ones polled longest ago."""
+    never = datetime.min
+    return sorted(item_ids, key=lambda item_id: marks.get(item_id, (None, never))[1])[:batch_size]
+
+
+def to_rows(item_id, points, last_timestamp):
+    """Convert API points (epoch ms, UTC midnight) to rows newer than the stored mark."""
+    rows = []
+    for point in points:
+        if point.get("price") is None or point.get("timestamp") is None:
+            continue
+        when = datetime.fromtimestamp(point["timestamp"] / 1000, timezone.utc).replace(tzinfo=None)
+        if last_timestamp is None or when > last_timestamp:
+            rows.append({"item_id": item_id, "timestamp": when, "price": int(point["price"]),
+                         "volume": None if point.get("volume") is None else int(point["volume"])})
+    return rows
+
+
+async def fetch_new_points(item_id, last_timestamp, limiter):
+    """Fetch an item's history, using the 90-day endpoint when only recent points can be missing."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    recent = last_timestamp is not None and now - last_timestamp < RECENT_SPAN
+    async with limiter:
+        points = await fetch_price_history(item_id, span="last90d" if recent else "all")
+    if points is None:
+        return None
+    return to_rows(item_id, points, last_timestamp)
+
+
+def refresh_aggregates(conn, since):
+    """Recompute every rollup period at or after each item's earliest new point ({item_id: datetime})."""
+    if not since:
+        return
+    params = {"item_ids": list(since), "since": list(since.values())}
+    for period in PERIODS:
+        conn.execute(REFRESH_AGGREGATES, {**params, "period": period})
+
+
+def store_points(engine, rows, checked, marks, now):
+    """
+    Write new points, advance the marks of every item that was polled and refresh touched rollups.
+
+    All three are one transaction: a mark only moves past points that were stored and rolled up, so a
+    failed write is fetched again on the item's next poll.
+    """
+    since = {}
+    newest = {}
+    for row in rows:
+        item_id, when = row["item_id"], row["timestamp"]
+        since[item_id] = min(since.get(item_id, when), when)
+        newest[item_id] = max(newest.get(item_id, when), when)
+
+    mark_rows = [{"item_id": item_id,
+                  "last_timestamp": newest.get(item_id, marks.get(item_id, (None, None))[0]),
+                  "last_checked": now} for item_id in checked]
+    with engine.begin() as conn:
+        for start in range(0, len(rows), POINTS_BATCH_SIZE):
+            conn.execute(insert(price_history).values(rows[start:start + POINTS_BATCH_SIZE])
+                         .on_conflict_do_nothing(index_elements=['item_id', 'timestamp']))
+        if mark_rows:
+            stmt = insert(price_history_marks).values(mark_rows)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=['item_id'],
+                set_={"last_timestamp": stmt.excluded.last_timestamp, "last_checked": stmt.excluded.last_checked}))
+        refresh_aggregates(conn, since)
+
+
+async def collect_history(engine, item_ids, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    One incremental collection cycle over the items due next.
+
+    Returns (points stored, items polled, items that failed).
+    """
+    await asyncio.to_thread(create_price_tables, engine)
+    marks = await asyncio.to_thread(load_marks, engine)
+    due = items_due(item_ids, marks, batch_size)
+    if not due:
+        return 0, 0, 0
+
+    limiter = AdaptiveLimiter("price_history")
+    results = await asyncio.gather(*(fetch_new_points(item_id, marks.get(item_id, (None, None))[0], limiter)
+                                     for item_id in due))
+    limiter.summary()
+
+    rows, checked, failed = [], [], 0
+    for item_id, result in zip(due, results):
+        if result is None:
+            failed += 1
+            continue
+        rows.extend(result)
+        checked.append(item_id)
+    await asyncio.to_thread(store_points, engine, rows, checked, marks, datetime.now())
+    logger.info(f"Price history: {len(rows)} new points for {len(checked)} items, {failed} failed.")
+    return len(rows), len(checked), failed
+
+
+def price_changes(engine, item_id):
+    """
+    Return {period: {"close", "previous_close", "change", "volume", "previous_volume"}} for the
+    current week/month/year against the one before, from the precomputed rollups.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(PRICE_CHANGES, {"item_id": item_id}).fetchall()
+    by_period = {}
+    for row in rows:
+        by_period.setdefault(row.period, []).append(row)
+
+    changes = {}
+    for period, (current, *previous) in by_period.items():
+        entry = {"close": current.close_price, "volume": current.volume,
+                 "previous_close": None, "previous_volume": None, "change": None}
+        if previous:
+            entry["previous_close"] = previous[0].close_price
+            entry["previous_volume"] = previous[0].volume
+            if previous[0].close_price:
+                entry["change"] = (current.close_price - previous[0].close_price) / previous[0].close_price
+        changes[period] = entry
+    return changes
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Collect new GE price history points for the items due next.")
+    parser.add_argument("--items", help="Comma-separated item ids (defaults to every item in the dump)")
+    parser.add_argument("--dump", default=DUMP_PATH, help="rs_dump copy to take items from")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="Items to poll this run")
+    args = parser.parse_args()
+
+    if args.items:
+        ids = [int(item_id) for item_id in args.items.split(",") if item_id.strip()]
+    else:
+        ids = list(ItemIndex.from_file(args.dump).items)
+    asyncio.run(run_and_close(collect_history(get_engine(), ids, args.batch)))
@@ -0,0 +1,177 @@
+# price_snapshots.py
+import argparse
+import logging
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import BigInteger, Column, Date, Integer, MetaData, PrimaryKeyConstraint, Table, text
+
+from cogs.common.bulk_upsert import bulk_upsert
+from cogs.common.db import get_engine
+from cogs.common.item_index import ItemIndex
+from cogs.common.rs_dump import DUMP_PATH
+
+logger = logging.getLogger(__name__)
+
+# Constants
+SNAPSHOT_TABLE = "ge_price_snapshots"
+DEFAULT_WINDOW_DAYS = 30
+MIN_VOLATILITY_POINTS = 5  # Daily returns needed before an item's volatility is ranked
+
+metadata = MetaData()
+
+# One row per item per GE update day, range-partitioned by month on day
+ge_price_snapshots = Table(
+    SNAPSHOT_TABLE, metadata,
+    Column('day', Date, nullable=False),
+    Column('item_id', Integer, nullable=False),
+    Column('price', BigInteger, nullable=False),
+    Column('volume', BigInteger, nullable=True),
+    PrimaryKeyConstraint('day', 'item_id'),
+    postgresql_partition_by='RANGE (day)',
+)
+
+
+def create_snapshot_table(engine):
+    """Create the partitioned parent table if it does not exist yet."""
+    metadata.create_all(engine, tables=[ge_price_snapshots])
+
+
+def partition_name(month):
+    return f"{SNAPSHOT_TABLE}_{month:%Y%m}"
+
+
+def ensure_partition(engine, day):
+    """Create the monthly partition holding `day` (no-op if it already exists)."""
+    start = date(day.year, day.month, 1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {SNAPSHOT_TABLE} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+
+
+def snapshot_day(index):
+    """The UTC day of the GE update an index's prices come from (today if the dump did not say)."""
+    if index.updated_at is None:
+        return datetime.now(timezone.utc).date()
+    return datetime.fromtimestamp(int(index.updated_at), timezone.utc).date()
+
+
+def write_price_snapshot(engine, index):
+    """Store every priced item's price and volume for the index's GE day; a later refresh that day overwrites it."""
+    day = snapshot_day(index)
+    rows = [{"day": day, "item_id": item_id, "price": int(item["price"]),
+             "volume": None if item.get("volume") is None else int(item["volume"])}
+            for item_id, item in index.items.items() if isinstance(item.get("price"), (int, float))]
+    create_snapshot_table(engine)
+    ensure_partition(engine, day)
+    result = bulk_upsert(engine, SNAPSHOT_TABLE, rows, conflict_columns=['day', 'item_id'], table=ge_price_snapshots)
+    logger.info(f"GE price snapshot for {day}: {result}")
+    return result
+
+
+class PriceMatrix:
+    """
+    Snapshots over a window of days as dense arrays: price and volume are float64 (items x days),
+    NaN where an item has no snapshot that day, so every analysis is a vectorized pass.
+    """
+    __slots__ = ("item_ids", "days", "price", "volume")
+
+    def __init__(self, item_ids, days, price, volume):
+        self.item_ids = item_ids
+        self.days = days
+        self.price = price
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def _top(self, scores, top, descending=True):
+        valid = np.flatnonzero(~np.isnan(scores))
+        order = valid[np.argsort(-scores[valid] if descending else scores[valid], kind="stable")]
+        return order[:top]
+
+    def _liquid(self, min_price, min_volume):
+        """Items whose latest price and volume clear the thresholds, so one-off trades do not dominate."""
+        latest_price, latest_volume = self.price[:, -1], self.volume[:, -1]
+        with np.errstate(invalid="ignore"):
+            return (latest_price >= min_price) & ~(latest_volume < min_volume)
+
+    def compare_column(self, days):
+        """Index of the newest snapshot at least `days` calendar days before the latest (the oldest if none is)."""
+        target = self.days[-1] - timedelta(days=days)
+        return max(bisect_right(self.days, target) - 1, 0)
+
+    def movers(self, days=1, top=10, min_price=0, min_volume=0, gainers=True):
+        """
+        [(item_id, change, old_price, new_price)] for the biggest relative price rises (or falls) since the
+        snapshot compare_column(days) picks; only items that actually moved that way are listed.
+        """
+        if len(self.days) < 2:
+            return []
+        old, new = self.price[:, self.compare_column(days)], self.price[:, -1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where((old > 0) & self._liquid(min_price, min_volume), (new - old) / old, np.nan)
+            change[~(change > 0) if gainers else ~(change < 0)] = np.nan
+        return [(int(self.item_ids[i]), float(change[i]), int(old[i]), int(new[i]))
+                for i in self._top(change, top, descending=gainers)]
+
+    def volatility(self, top=10, min_price=0, min_volume=0):
+        """[(item_id, stddev of daily log returns, latest price)] for the most volatile items."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(np.where(self.price > 0, self.price, np.nan)), axis=1)
+        points = np.sum(~np.isnan(returns), axis=1)
+        eligible = (points >= MIN_VOLATILITY_POINTS) & self._liquid(min_price, min_volume)
+        scores = np.full(len(self), np.nan)
+        if eligible.any():
+            scores[eligible] = np.nanstd(returns[eligible], axis=1)
+        return [(int(self.item_ids[i]), float(scores[i]), int(self.price[i, -1]))
+                for i in self._top(scores, top)]
+
+    def volume_spikes(self, top=10, min_price=0, min_volume=0):
+        """[(item_id, latest volume / median earlier volume, latest volume)] for the largest spikes."""
+        if len(self.days) < 2:
+            return []
+        history = self.volume[:, :-1]
+        known = ~np.isnan(history).all(axis=1)
+        median = np.full(len(self), np.nan)
+        median[known] = np.nanmedian(history[known], axis=1)
+        latest = self.volume[:, -1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where((median > 0) & self._liquid(min_price, min_volume), latest / median, np.nan)
+        return [(int(self.item_ids[i]), float(ratio[i]), int(latest[i])) for i in self._top(ratio, top)]
+
+
+def load_price_matrix(engine, window_days=DEFAULT_WINDOW_DAYS, until=None):
+    """Read the last `window_days` of snapshots (only those partitions) into a PriceMatrix."""
+    until = until or datetime.now(timezone.utc).date()
+    query = text(f"""
+        SELECT day, item_id, price, volume
+        FROM {SNAPSHOT_TABLE}
+        WHERE day > :start AND day <= :end
+    """)
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn, params={"start": until - timedelta(days=window_days), "end": until})
+    if df.empty:
+        empty = np.empty((0, 0))
+        return PriceMatrix(np.empty(0, dtype=np.int64), [], empty, empty)
+
+    item_ids, rows = np.unique(df["item_id"].to_numpy(dtype=np.int64), return_inverse=True)
+    days, columns = np.unique(df["day"].to_numpy(), return_inverse=True)
+    price = np.full((len(item_ids), len(days)), np.nan)
+    volume = np.full((len(item_ids), len(days)), np.nan)
+    price[rows, columns] = df["price"].to_numpy(dtype=np.float64)
+    volume[rows, columns] = df["volume"].to_numpy(dtype=np.float64, na_value=np.nan)
+    return PriceMatrix(item_ids, list(days), price, volume)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Store today's GE prices from the on-disk dump as a snapshot.")
+    parser.add_argument("--dump", default=DUMP_PATH, help="rs_dump copy to snapshot")
+    args = parser.parse_args()
+    write_price_snapshot(get_engine(), ItemIndex.from_file(args.dump))
@@ -0,0 +1,135 @@
+# catalog_sync.py
+import hashlib
+import logging
+import math
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, Table, text
+
+from cogs.common.bulk_upsert import DEFAULT_BATCH_SIZE, BulkResult, bulk_upsert
+from cogs.common.rs_dump import batched
+
+logger = logging.getLogger(__name__)
+
+# Constants
+ITEMS_TABLE = "items"
+PRICES_TABLE = "item_prices"
+# Metadata that almost never changes lives in items; the fields that move daily live in item_prices
+STATIC_COLUMNS = ['name', 'examine', 'members', 'limit', 'value', 'highalch', 'lowalch', 'name_pt', 'icon']
+PRICE_COLUMNS = ['price', 'last', 'volume']
+INTEGER_COLUMNS = {'limit', 'value', 'highalch', 'lowalch', 'price', 'last', 'volume'}
+
+metadata = MetaData()
+
+item_prices = Table(
+    PRICES_TABLE, metadata,
+    Column('id', BigInteger, primary_key=True),
+    Column('price', BigInteger, nullable=True),
+    Column('last', BigInteger, nullable=True),
+    Column('volume', BigInteger, nullable=True),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+
+def ensure_catalog_schema(engine):
+    """Add the fingerprint column to items and create item_prices (both no-ops once done)."""
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {ITEMS_TABLE} ADD COLUMN IF NOT EXISTS fingerprint BIGINT"))
+    metadata.create_all(engine, tables=[item_prices])
+
+
+def coerce_int(value):
+    """Whole number or None, matching sanitize_items(): floats are rounded, junk becomes None."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) or math.isinf(number) else int(round(number))
+
+
+def split_item(item_id, record):
+    """Split one dump record into its static items row and its item_prices row."""
+    static = {"id": item_id}
+    for col in STATIC_COLUMNS:
+        value = record.get(col)
+        static[col] = coerce_int(value) if col in INTEGER_COLUMNS else value
+    prices = {"id": item_id}
+    for col in PRICE_COLUMNS:
+        prices[col] = coerce_int(record.get(col))
+    return static, prices
+
+
+def fingerprint(static_row):
+    """Signed 64-bit digest of an item's static columns, stored alongside it in items.fingerprint."""
+    payload = "\x1f".join(repr(static_row.get(col)) for col in STATIC_COLUMNS).encode()
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "big", signed=True)
+
+
+class CatalogSync:
+    """
+    Differential sync of the rs_dump catalog into items and item_prices.
+
+    The stored fingerprints and prices are read once (two narrow scans); each batch of dump records
+    is then compared in memory and only rows whose content changed are upserted.
+    """
+
+    def __init__(self, engine, batch_size=DEFAULT_BATCH_SIZE):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.items_result = BulkResult()
+        self.prices_result = BulkResult()
+        self.invalid = 0
+        ensure_catalog_schema(engine)
+        self.items_table = Table(ITEMS_TABLE, MetaData(), autoload_with=engine)
+        with engine.connect() as conn:
+            self.fingerprints = dict(conn.execute(text(f"SELECT id, fingerprint FROM {ITEMS_TABLE}")).fetchall())
+            self.prices = {row.id: (row.price, row.last, row.volume) for row in
+                           conn.execute(text(f"SELECT id, price, last, volume FROM {PRICES_TABLE}"))}
+        logger.info(f"Catalog sync: {len(self.fingerprints)} stored items, {len(self.prices)} stored prices.")
+
+    def add(self, records):
+        """Compare a batch of (item_id, record) pairs against the stored catalog and write what changed."""
+        changed_items, changed_prices = [], []
+        invalid = 0
+        now = datetime.now()
+        for item_id, record in records:
+            if not record.get("name"):
+                invalid += 1
+                logger.error(f"Missing required fields for item ID: {item_id}")
+                continue
+            static, prices = split_item(item_id, record)
+            static["fingerprint"] = fingerprint(static)
+            if self.fingerprints.get(item_id) != static["fingerprint"]:
+                changed_items.append(static)
+                self.fingerprints[item_id] = static["fingerprint"]
+            values = tuple(prices[col] for col in PRICE_COLUMNS)
+            if self.prices.get(item_id) != values:
+                prices["updated_at"] = now
+                changed_prices.append(prices)
+                self.prices[item_id] = values
+
+        # Unchanged rows never reach the database
+        self.invalid += invalid
+        self.items_result.skipped += len(records) - len(changed_items) - invalid
+        self.prices_result.skipped += len(records) - len(changed_prices) - invalid
+        if changed_items:
+            self.items_result.add(bulk_upsert(self.engine, ITEMS_TABLE, changed_items, conflict_columns=['id'],
+                                              batch_size=self.batch_size, table=self.items_table))
+        if changed_prices:
+            self.prices_result.add(bulk_upsert(self.engine, PRICES_TABLE, changed_prices, conflict_columns=['id'],
+                                               batch_size=self.batch_size, table=item_prices))
+
+    def summary(self):
+        logger.info(f"Catalog sync items: {self.items_result}; prices: {self.prices_result}; "
+                    f"{self.invalid} invalid records skipped")
+        return self.items_result, self.prices_result
+
+
+def sync_catalog(engine, records, batch_size=DEFAULT_BATCH_SIZE):
+    """Sync an iterable of (item_id, record) pairs, e.g. iter_dump_records(), one batch at a time."""
+    sync = CatalogSync(engine, batch_size)
+    for batch in batched(records, batch_size):
+        sync.add(batch)
+    return sync.summary()
@@ -29,7 +29,8 @@ def create_items_table(engine):
         Column('price', BigInteger, nullable=True),
         Column('last', BigInteger, nullable=True),
         Column('volume', BigInteger, nullable=True),
-        Column('icon', String, nullable=True)  # Added 'icon' field based on JSON
+        Column('icon', String, nullable=True),  # Added 'icon' field based on JSON
+        Column('fingerprint', BigInteger, nullable=True)  # Digest of the static columns, see catalog_sync.py
     )
 
     metadata.create_all(engine)
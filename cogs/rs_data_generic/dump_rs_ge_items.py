@@ -1,15 +1,16 @@
-import requests
-import json
+import asyncio
+
+from cogs.common.http_client import run_and_close
+from cogs.common.rs_api import RS_DUMP_URL
+from cogs.common.rs_dump import DUMP_PATH, download_rs_dump
 
 # Define the URL of the item database
-url = "https://chisel.weirdgloop.org/gazproj/gazbot/rs_dump.json"
-output_file = "rs_item_database.json"
+url = RS_DUMP_URL
+output_file = DUMP_PATH
 
-# Download the JSON file
-response = requests.get(url)
-if response.status_code == 200:
-    with open(output_file, 'w') as f:
-        json.dump(response.json(), f, indent=4)
-    print(f"Database successfully downloaded and saved as {output_file}")
+# Stream the JSON file to the shared compressed copy that insert_items.py and /price read
+digest = asyncio.run(run_and_close(download_rs_dump(output_file, url)))
+if digest is not None:
+    print(f"Database up to date in {output_file} (sha256 {digest[:12]})")
 else:
-    print(f"Failed to download data. Status code: {response.status_code}")
+    print("Failed to download data.")
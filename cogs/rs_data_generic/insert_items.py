@@ -1,12 +1,17 @@
 import os
 import json
+import argparse
+import asyncio
 import pandas as pd
-import requests
 from sqlalchemy import create_engine, Table, MetaData
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.dialects.postgresql import insert  # PostgreSQL-specific insert
 from datetime import datetime
-import math
+
+from cogs.common.bulk_upsert import DEFAULT_BATCH_SIZE, BulkResult, bulk_upsert
+from cogs.common.http_client import run_and_close
+from cogs.common.rs_api import RS_DUMP_URL
+from cogs.common.rs_dump import (DUMP_PATH, batched, download_rs_dump, dump_processed, iter_dump_records, load_dump_meta,
+                                 mark_dump_processed)
+from cogs.rs_data_generic.catalog_sync import sync_catalog
 
 # Load database configuration from dbconfig.json
 config_path = os.path.join(os.path.expanduser("~"), 'discordbot10s', 'dbconfig.json')
@@ -45,118 +50,101 @@ def log_conflict(message, row_data, log_file="data_insert_conflict_log.txt"):
         file.write(f"[{timestamp}] CONFLICT: {message}\n")
         file.write(f"Row Data: {row_data}\n\n")
 
-def sanitize_row(row_dict):
+INTEGER_COLUMNS = ['limit', 'highalch', 'lowalch', 'value', 'price', 'last', 'volume']
+REQUIRED_FIELDS = ['id', 'name']
+
+def sanitize_items(df):
     """
-    Replace NaN with None for integer columns and convert floats to integers where appropriate.
+    Coerce integer columns in one vectorized pass: NaN and unparseable strings become None,
+    floats are rounded to whole numbers.
     """
-    integer_columns = ['limit', 'highalch', 'lowalch', 'value', 'price', 'last', 'volume']
-    
-    for col in integer_columns:
-        if col in row_dict:
-            value = row_dict[col]
-            if isinstance(value, float):
-                if math.isnan(value):
-                    row_dict[col] = None
-                else:
-                    # Convert float to int if it's a whole number
-                    if value.is_integer():
-                        row_dict[col] = int(value)
-                    else:
-                        # Handle cases where float is not a whole number
-                        row_dict[col] = int(round(value))
-            elif isinstance(value, str):
-                # Attempt to convert string numbers to integers
-                try:
-                    row_dict[col] = int(value)
-                except ValueError:
-                    row_dict[col] = None
-    return row_dict
-
-def validate_required_fields(row_dict):
-    """Ensure that required fields are present and not None."""
-    required_fields = ['id', 'name']
-    for field in required_fields:
-        if field not in row_dict or row_dict[field] is None:
-            return False
-    return True
-
-def insert_items(engine, df, table_name, unique_column="id"):
-    print(f"Processing {len(df)} rows")  # This should display 50 rows if slicing works correctly
-    metadata = MetaData()
-    table = Table(table_name, metadata, autoload_with=engine)
+    df = df.copy()
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype('Int64')
+    return df
+
+def validate_required_fields(df):
+    """Split rows into those with every required field present and those missing one."""
+    present = [col for col in REQUIRED_FIELDS if col in df.columns]
+    if len(present) < len(REQUIRED_FIELDS):
+        return df.iloc[0:0], df
+    mask = df[present].notna().all(axis=1)
+    return df[mask], df[~mask]
+
+def insert_items(engine, df, table_name, unique_column="id", batch_size=DEFAULT_BATCH_SIZE, table=None):
+    print(f"Processing {len(df)} rows")
+    if table is None:
+        table = Table(table_name, MetaData(), autoload_with=engine)
     table_columns = [column.name for column in table.columns]
 
     df = adjust_dataframe_structure(df, table_columns)
+    df = sanitize_items(df)  # Sanitize row data
+
+    # Validate required fields
+    df, invalid = validate_required_fields(df)
+    for row_dict in invalid.to_dict("records"):
+        log_error(f"Missing required fields for item ID: {row_dict.get('id')}", row_dict)
+
+    # Upsert logic: Insert new rows or update existing ones based on unique_column
+    result = bulk_upsert(engine, table_name, df, conflict_columns=[unique_column],
+                         batch_size=batch_size, table=table)
+    result.skipped += len(invalid)
+    log_message(f"Items upsert on {unique_column}: {result.inserted} inserted, {result.updated} updated, "
+                f"{result.skipped} unchanged or invalid, {result.failed} failed")
+    return result
 
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            try:
-                row_dict = row.to_dict()
-                row_dict = sanitize_row(row_dict)  # Sanitize row data
-
-                # Validate required fields
-                if not validate_required_fields(row_dict):
-                    log_error(f"Missing required fields for item ID: {row_dict.get('id')}", row_dict)
-                    continue  # Skip this row
-
-                # Upsert logic: Insert new rows or update existing ones based on unique_column
-                insert_stmt = insert(table).values(**row_dict)
-                upsert_stmt = insert_stmt.on_conflict_do_update(
-                    index_elements=[unique_column],
-                    set_={col: insert_stmt.excluded[col] for col in row_dict if col != unique_column}
-                )
-                conn.execute(upsert_stmt)
-                log_message(f"Upserted row with {unique_column}: {row_dict[unique_column]}")
-            except SQLAlchemyError as e:
-                log_error(f"Database error while inserting row with {unique_column}: {row_dict.get(unique_column)}", row_dict)
-                log_error(str(e))
-            except Exception as e:
-                log_error(f"Unexpected error while inserting row with {unique_column}: {row_dict.get(unique_column)}", row_dict)
-                log_error(str(e))
-
-def download_and_prepare_data(url):
-    """Downloads JSON data from the specified URL and prepares it as a DataFrame."""
-    response = requests.get(url)
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            # Save raw JSON for inspection
-            with open("raw_rs_dump.json", "w") as f:
-                json.dump(data, f, indent=4)
-            # Flatten the JSON: convert dict of dicts to list of dicts
-            items_list = []
-            for item_id, item_data in data.items():
-                try:
-                    # Attempt to convert the item_id to an integer
-                    int_id = int(item_id)
-                    item_data['id'] = int_id  # Ensure 'id' is integer
-                    items_list.append(item_data)
-                except ValueError:
-                    # If conversion fails, skip this entry and log the issue
-                    log_error(f"Skipping item with non-integer ID: {item_id}", item_data)
-            df = pd.DataFrame(items_list)
-            return df
-        except json.JSONDecodeError as jde:
-            raise Exception("Failed to parse JSON. The response might not be valid JSON.")
-    else:
-        raise Exception(f"Failed to download data. Status code: {response.status_code}")
+def insert_items_streamed(engine, path, table_name, unique_column="id", batch_size=DEFAULT_BATCH_SIZE):
+    """Full upsert from the dump on disk, one DataFrame per batch so memory stays flat as the catalog grows."""
+    table = Table(table_name, MetaData(), autoload_with=engine)
+    totals = BulkResult()
+    for batch in batched(iter_dump_records(path), batch_size):
+        df = pd.DataFrame([{**record, "id": item_id} for item_id, record in batch])
+        totals.add(insert_items(engine, df, table_name, unique_column=unique_column, batch_size=batch_size,
+                                table=table))
+    return totals
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the rs_dump GE catalog into the database.")
+    parser.add_argument("--full", action="store_true",
+                        help="Upsert every item into the wide items table instead of syncing only changed rows")
+    parser.add_argument("--no-download", action="store_true", help="Load the copy already on disk")
+    parser.add_argument("--force", action="store_true", help="Load even if this content was already processed")
+    parser.add_argument("--dump", default=DUMP_PATH, help="Where the compressed dump is kept")
+    args = parser.parse_args()
+
     # URL of the item database
-    url = "https://chisel.weirdgloop.org/gazproj/gazbot/rs_dump.json"
+    url = RS_DUMP_URL
+    consumer = "insert_items_full" if args.full else "catalog_sync"
     
     try:
-        # Download and prepare data
-        df_items = download_and_prepare_data(url)
-        log_message("JSON data downloaded and converted to DataFrame.")
-        
-        # Limit df for experimentation
-        #df_items_limited = df_items.head(50)
-        #print(f"Limited DataFrame to {len(df_items_limited)} rows.")
-        
-        # Insert data into 'items' table with upsert logic
-        insert_items(engine, df_items, 'items', unique_column="id")
-        log_message("Data insertion into 'items' table completed successfully.")
+        # The body is streamed straight to one compressed copy on disk and parsed from there in batches.
+        # The download is conditional, so an unchanged catalog costs a 304.
+        if args.no_download:
+            digest = load_dump_meta(args.dump).get("sha256")
+        else:
+            digest = asyncio.run(run_and_close(download_rs_dump(args.dump, url)))
+            if digest is None:
+                raise Exception("Failed to download data.")
+
+        failed = 0
+        if digest is not None and digest == dump_processed(consumer, args.dump) and not args.force:
+            log_message("Catalog content unchanged since the last load; nothing to do.")
+        elif args.full:
+            # Insert data into 'items' table with upsert logic
+            result = insert_items_streamed(engine, args.dump, 'items', unique_column="id")
+            failed = result.failed
+            log_message(f"Data insertion into 'items' table completed: {result}")
+        else:
+            # Differential sync: static metadata to items, price fields to item_prices, changed rows only
+            items_result, prices_result = sync_catalog(engine, iter_dump_records(args.dump))
+            failed = items_result.failed + prices_result.failed
+            log_message(f"Catalog sync completed: items {items_result}, prices {prices_result}")
+        # Content with failed rows is loaded again next run rather than skipped until the dump changes
+        if failed:
+            log_error(f"{failed} rows failed; this dump will be processed again on the next run.")
+        elif digest is not None:
+            mark_dump_processed(consumer, digest, args.dump)
     except Exception as e:
         log_error("An error occurred during the data download or insertion process.", None)
         log_error(str(e))
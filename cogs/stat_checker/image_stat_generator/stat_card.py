@@ -0,0 +1,121 @@
+# stat_card.py
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from cogs.common.hiscores import MISSING, SKILLS
+
+logger = logging.getLogger(__name__)
+
+# Layout
+SKILL_ICONS_DIR = os.path.join(os.path.dirname(__file__), "skill_icons")
+ICON_FILES = {"Constitution": "hitpoints.png"}  # Everything else is <skill>.png
+COLUMNS = 3
+CELL_SIZE = (200, 56)
+ICON_SIZE = (36, 36)
+PADDING = 12
+HEADER_HEIGHT = 56
+BACKGROUND = (30, 30, 30)
+CELL_BACKGROUND = (48, 44, 38)
+CELL_BORDER = (92, 80, 60)
+TEXT_COLOR = (255, 255, 255)
+SUBTEXT_COLOR = (190, 180, 160)
+FONT_CANDIDATES = ("DejaVuSans-Bold.ttf", "DejaVuSans.ttf", "arial.ttf")
+
+# Skills are drawn in a grid with Overall (total level) in the last cell
+GRID_ORDER = SKILLS[1:] + SKILLS[:1]
+ROWS = -(-len(GRID_ORDER) // COLUMNS)
+CARD_SIZE = (PADDING * 2 + COLUMNS * CELL_SIZE[0], HEADER_HEIGHT + PADDING + ROWS * CELL_SIZE[1] + PADDING)
+
+# Rendering is CPU-bound; keep it off the event loop
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="statcard")
+_template = None
+_template_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """Load a TrueType font once per size, falling back to Pillow's bundled font."""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def cell_origin(position):
+    column, row = position % COLUMNS, position // COLUMNS
+    return PADDING + column * CELL_SIZE[0], HEADER_HEIGHT + PADDING + row * CELL_SIZE[1]
+
+
+def build_template():
+    """Draw everything that is the same on every card: background, grid cells and skill icons."""
+    image = Image.new("RGB", CARD_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    for position, skill in enumerate(GRID_ORDER):
+        x, y = cell_origin(position)
+        draw.rectangle([x + 2, y + 2, x + CELL_SIZE[0] - 2, y + CELL_SIZE[1] - 2],
+                       fill=CELL_BACKGROUND, outline=CELL_BORDER)
+        icon_y = y + (CELL_SIZE[1] - ICON_SIZE[1]) // 2
+        if skill == "Overall":
+            draw.text((x + 8, icon_y + 8), "Total", fill=SUBTEXT_COLOR, font=get_font(14))
+            continue
+        icon_path = os.path.join(SKILL_ICONS_DIR, ICON_FILES.get(skill, f"{skill.lower()}.png"))
+        try:
+            with Image.open(icon_path) as icon:
+                icon = icon.convert("RGBA").resize(ICON_SIZE, Image.Resampling.LANCZOS)
+                image.paste(icon, (x + 8, icon_y), icon)
+        except OSError as e:
+            logger.warning(f"Missing icon for {skill}: {e}")
+            draw.rectangle([x + 8, icon_y, x + 8 + ICON_SIZE[0], icon_y + ICON_SIZE[1]], fill=(100, 100, 100))
+    return image
+
+
+def get_template():
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = build_template()
+    return _template
+
+
+def render_stat_card_sync(stats):
+    """Copy the template and draw only the per-player text; returns PNG bytes."""
+    image = get_template().copy()
+    draw = ImageDraw.Draw(image)
+    level_font, xp_font = get_font(20), get_font(12)
+
+    overall_xp = stats.experience[0]
+    draw.text((PADDING, 14), stats.username, fill=TEXT_COLOR, font=get_font(24))
+    if overall_xp != MISSING:
+        total = f"Total XP {int(overall_xp):,}"
+        width = draw.textlength(total, font=get_font(16))
+        draw.text((CARD_SIZE[0] - PADDING - width, 20), total, fill=SUBTEXT_COLOR, font=get_font(16))
+
+    levels = stats.level
+    for position, skill in enumerate(GRID_ORDER):
+        index = SKILLS.index(skill)
+        x, y = cell_origin(position)
+        text_x = x + 8 + ICON_SIZE[0] + 10
+        level = "-" if levels[index] == MISSING else str(int(levels[index]))
+        experience = "-" if stats.experience[index] == MISSING else f"{int(stats.experience[index]):,} xp"
+        draw.text((text_x, y + 8), level, fill=TEXT_COLOR, font=level_font)
+        draw.text((text_x, y + 33), experience, fill=SUBTEXT_COLOR, font=xp_font)
+
+    output = io.BytesIO()
+    image.save(output, format="PNG", compress_level=1)
+    return output.getvalue()
+
+
+async def render_stat_card(stats):
+    """Render a stat card in the worker pool so the Discord event loop never blocks on Pillow."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, render_stat_card_sync, stats)